@@ -0,0 +1,36 @@
+"""Add (conversation_id, created_at) index on messages
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No revision creates the tables; the app's create_all does, along with
+    # this index (declared on the model). So on an empty database there is
+    # nothing to do, and on an existing one the index may already be there.
+    if not sa.inspect(op.get_bind()).has_table("messages"):
+        return
+    op.create_index(
+        "ix_messages_conversation_id_created_at",
+        "messages",
+        ["conversation_id", sa.text("created_at DESC")],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("messages"):
+        return
+    op.drop_index("ix_messages_conversation_id_created_at", table_name="messages", if_exists=True)
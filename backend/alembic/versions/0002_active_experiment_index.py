@@ -0,0 +1,35 @@
+"""Add partial (created_at) WHERE active index on experiments
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # See 0001: without the table, create_all builds it with this index
+    if not sa.inspect(op.get_bind()).has_table("experiments"):
+        return
+    op.create_index(
+        "ix_experiments_active_created_at",
+        "experiments",
+        ["created_at"],
+        postgresql_where=sa.text("active"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("experiments"):
+        return
+    op.drop_index("ix_experiments_active_created_at", table_name="experiments", if_exists=True)
@@ -1,15 +1,14 @@
 """Analytics endpoints for dashboard metrics."""
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case, cast, Date
-from datetime import datetime, timezone, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, cast, select, Date
+from datetime import timedelta
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db_ro, utcnow
 from app.models.message import Message, MessageRole
 from app.models.feedback import Feedback
 from app.models.conversation import Conversation
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -17,8 +16,8 @@ router = APIRouter(prefix="/analytics", tags=["analytics"])
 @router.get("/overview")
 async def get_overview(
     days: int = Query(default=7, ge=1, le=90),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """
     High-level platform statistics over a time range.
@@ -26,13 +25,13 @@ async def get_overview(
     Returns total conversations, messages, cost, latency percentiles,
     and feedback approval rate.
     """
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    cutoff = utcnow() - timedelta(days=days)
 
     # Base query: assistant messages belonging to this user within the time range
     base = (
-        db.query(Message)
+        select(Message)
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.role == MessageRole.ASSISTANT,
             Message.created_at >= cutoff,
@@ -40,51 +39,48 @@ async def get_overview(
     )
 
     # Aggregate stats
-    stats = base.with_entities(
+    stats = (await db.execute(base.with_only_columns(
         func.count(Message.id).label("total_messages"),
         func.count(func.distinct(Message.conversation_id)).label("total_conversations"),
         func.coalesce(func.sum(Message.cost), 0).label("total_cost"),
         func.coalesce(func.avg(Message.cost), 0).label("avg_cost"),
         func.coalesce(func.avg(Message.latency_ms), 0).label("avg_latency_ms"),
-    ).first()
+    ))).first()
 
     # P95 latency via subquery
-    latency_values = [
-        row[0]
-        for row in base.with_entities(Message.latency_ms)
-        .filter(Message.latency_ms.isnot(None))
+    latency_values = (await db.execute(
+        base.with_only_columns(Message.latency_ms)
+        .where(Message.latency_ms.isnot(None))
         .order_by(Message.latency_ms)
-        .all()
-    ]
+    )).scalars().all()
     p95_latency = 0
     if latency_values:
         idx = int(len(latency_values) * 0.95)
         p95_latency = latency_values[min(idx, len(latency_values) - 1)]
 
     # Feedback stats
-    feedback_stats = (
-        db.query(
+    feedback_stats = (await db.execute(
+        select(
             func.count(Feedback.id).label("total_feedback"),
             func.sum(case((Feedback.rating == 1, 1), else_=0)).label("thumbs_up"),
         )
         .join(Message, Feedback.message_id == Message.id)
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Feedback.created_at >= cutoff,
         )
-        .first()
-    )
+    )).first()
 
     total_feedback = feedback_stats[0] or 0
     thumbs_up = feedback_stats[1] or 0
     approval_rate = round((thumbs_up / total_feedback * 100), 1) if total_feedback > 0 else 0
 
     # Total tokens
-    token_stats = base.with_entities(
+    token_stats = (await db.execute(base.with_only_columns(
         func.coalesce(func.sum(Message.tokens_in), 0).label("total_tokens_in"),
         func.coalesce(func.sum(Message.tokens_out), 0).label("total_tokens_out"),
-    ).first()
+    ))).first()
 
     return {
         "days": days,
@@ -104,18 +100,18 @@ async def get_overview(
 @router.get("/usage")
 async def get_usage(
     days: int = Query(default=7, ge=1, le=90),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """
     Daily usage time-series for charting.
 
     Returns per-day message count, total cost, avg latency, and total tokens.
     """
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    cutoff = utcnow() - timedelta(days=days)
 
-    rows = (
-        db.query(
+    rows = (await db.execute(
+        select(
             cast(Message.created_at, Date).label("date"),
             func.count(Message.id).label("messages"),
             func.coalesce(func.sum(Message.cost), 0).label("cost"),
@@ -125,15 +121,14 @@ async def get_usage(
             ).label("tokens_total"),
         )
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.role == MessageRole.ASSISTANT,
             Message.created_at >= cutoff,
         )
         .group_by(cast(Message.created_at, Date))
         .order_by(cast(Message.created_at, Date))
-        .all()
-    )
+    )).all()
 
     return {
         "days": days,
@@ -152,8 +147,8 @@ async def get_usage(
 
 @router.get("/experiments")
 async def get_experiments(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """
     Experiment variant performance comparison.
@@ -161,8 +156,8 @@ async def get_experiments(
     Returns per-variant message count, avg latency, avg cost,
     approval rate, and sample size.
     """
-    rows = (
-        db.query(
+    rows = (await db.execute(
+        select(
             Message.experiment_variant.label("variant"),
             func.count(Message.id).label("messages"),
             func.coalesce(func.avg(Message.latency_ms), 0).label("avg_latency_ms"),
@@ -172,14 +167,13 @@ async def get_experiments(
         )
         .outerjoin(Feedback, Message.id == Feedback.message_id)
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.role == MessageRole.ASSISTANT,
             Message.experiment_variant.isnot(None),
         )
         .group_by(Message.experiment_variant)
-        .all()
-    )
+    )).all()
 
     return {
         "experiments": [
@@ -202,8 +196,8 @@ async def get_experiments(
 
 @router.get("/latency")
 async def get_latency_distribution(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """
     Latency distribution bucketed into ranges.
@@ -219,9 +213,10 @@ async def get_latency_distribution(
     ]
 
     base = (
-        db.query(Message.latency_ms)
+        select(func.count())
+        .select_from(Message)
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.role == MessageRole.ASSISTANT,
             Message.latency_ms.isnot(None),
@@ -231,10 +226,10 @@ async def get_latency_distribution(
     result = []
     for label, low, high in buckets:
         q = base
-        q = q.filter(Message.latency_ms >= low)
+        q = q.where(Message.latency_ms >= low)
         if high is not None:
-            q = q.filter(Message.latency_ms < high)
-        count = q.count()
+            q = q.where(Message.latency_ms < high)
+        count = await db.scalar(q)
         result.append({"bucket": label, "count": count})
 
     return {"distribution": result}
@@ -2,34 +2,37 @@
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
 
-from app.database import get_db
+from app.database import get_db, get_db_ro
 from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.message import Message
-from app.middleware.auth import get_current_user, hash_api_key
+from app.middleware.auth import (
+    AuthenticatedUser,
+    authenticated_user_cache,
+    get_current_user,
+    hash_api_key,
+)
 
 router = APIRouter(prefix="/api-keys", tags=["api-keys"])
 
 
 @router.get("/me")
 async def get_current_key_info(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """Get info about the current API key (usage stats, not the key itself)."""
-    conversation_count = (
-        db.query(func.count(Conversation.id))
-        .filter(Conversation.user_id == user.id)
-        .scalar()
+    conversation_count = await db.scalar(
+        select(func.count(Conversation.id))
+        .where(Conversation.user_id == user.id)
     )
-    message_count = (
-        db.query(func.count(Message.id))
+    message_count = await db.scalar(
+        select(func.count(Message.id))
         .join(Conversation)
-        .filter(Conversation.user_id == user.id)
-        .scalar()
+        .where(Conversation.user_id == user.id)
     )
 
     return {
@@ -44,8 +47,8 @@ async def get_current_key_info(
 
 @router.post("/rotate")
 async def rotate_api_key(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Rotate the current API key.
@@ -54,8 +57,14 @@ async def rotate_api_key(
     The new key is returned once — save it immediately.
     """
     new_key = f"pk-{secrets.token_urlsafe(32)}"
-    user.api_key_hash = hash_api_key(new_key)
-    db.commit()
+    await db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(api_key_hash=hash_api_key(new_key))
+    )
+    await db.commit()
+    # The old key must stop working in every worker, not after the cache TTL
+    await authenticated_user_cache.invalidate(user.api_key_hash)
 
     return {
         "status": "success",
@@ -66,8 +75,8 @@ async def rotate_api_key(
 
 @router.post("/generate")
 async def generate_new_key(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Generate a new API key (creates a new user).
@@ -80,8 +89,8 @@ async def generate_new_key(
         rate_limit=user.rate_limit,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return {
         "status": "success",
@@ -8,23 +8,28 @@ Features:
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Dict
-import json
-import redis
+from sqlalchemy import Integer, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import aclosing
+from typing import List, Dict, Tuple
+import uuid
+import orjson
+import redis.asyncio as aioredis
 import asyncio
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.schemas.chat import ChatRequest
-from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.message import Message, MessageRole
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
 from app.middleware.logging import get_logger
 from app.services.llm import LLMService
 from app.services.experiments import ExperimentService
 from app.services.rate_limiter import RateLimiter
 from app.services.stream_limiter import StreamLimiter, StreamLimitExceeded
+from app.services.admission import ChatAdmission
+from app.services.cache import LocalCache
+from app.services.streaming import coalesce_tokens, with_heartbeat
 from app.services.token_counter import get_token_counter
 from app.models.prompt_version import PromptVersion
 from app.config import get_settings
@@ -43,66 +48,154 @@ llm_service = LLMService(
     api_key=settings.openai_api_key,
     token_counter=token_counter
 )
-# Redis-dependent services (optional — gracefully skipped if unavailable)
-_redis_client = None
+# Redis-dependent services (optional — gracefully skipped if unavailable).
+# A single pooled asyncio client is shared by every request so limiter calls
+# never block the event loop; connectivity is verified by init_redis() at startup.
+redis_client: aioredis.Redis | None = None
 rate_limiter = None
 stream_limiter = None
+admission = None
 
 if settings.redis_url:
     try:
-        _redis_client = redis.from_url(settings.redis_url)
-        _redis_client.ping()
-        rate_limiter = RateLimiter(_redis_client)
+        _redis_pool = aioredis.ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True
+        )
+        redis_client = aioredis.Redis(connection_pool=_redis_pool)
+        rate_limiter = RateLimiter(redis_client)
         stream_limiter = StreamLimiter(
-            _redis_client,
+            redis_client,
             default_limit=settings.max_concurrent_streams_per_user
         )
+        admission = ChatAdmission(rate_limiter, stream_limiter)
     except Exception:
-        import logging as _log
-        _log.warning("Redis unavailable — rate limiting and stream limiting disabled")
+        logger.warning("redis_unavailable", reason="invalid_redis_url", limits="disabled")
+
+
+# SSE frames. Token frames have a fixed shape, so only the token itself is
+# JSON-encoded per chunk; fully static frames are encoded once at import.
+_TOKEN_FRAME_PREFIX = b'data: {"token": '
+_TOKEN_FRAME_SUFFIX = b'}\n\n'
+_TIMEOUT_FRAME = (
+    b"data: " + orjson.dumps({"error": "Stream timeout exceeded", "partial_content": True}) + b"\n\n"
+)
+_LLM_ERROR_FRAME = b"data: " + orjson.dumps({"error": "Failed to get response from LLM"}) + b"\n\n"
 
 
-def get_or_create_conversation(
-    db: Session,
+# Hot-path statements, built once at import. SQLAlchemy caches the compiled
+# SQL by statement, so each request only binds parameters.
+_CONVERSATION_STMT = select(Conversation).where(
+    Conversation.id == bindparam("conversation_id"),
+    Conversation.user_id == bindparam("user_id")
+)
+_HISTORY_STMT = (
+    select(Message.role, Message.content)
+    .where(Message.conversation_id == bindparam("conversation_id"))
+    .order_by(Message.created_at.desc())
+    .limit(bindparam("limit", type_=Integer))
+)
+_ACTIVE_PROMPT_STMT = (
+    select(PromptVersion)
+    .where(PromptVersion.variant == bindparam("variant"), PromptVersion.is_active == True)
+    .limit(1)
+)
+
+
+# (conversation_id, user_id) pairs whose ownership was recently verified.
+# Conversations are reused for many consecutive messages, so this skips the
+# ownership SELECT on most chat requests. Evicted on delete in every worker.
+conversation_owner_cache = LocalCache("conversation_owner", maxsize=10_000, ttl=300)
+
+
+async def init_redis() -> None:
+    """Ping Redis once at startup; disable rate/stream limiting if it is unreachable."""
+    global redis_client, rate_limiter, stream_limiter, admission
+    if redis_client is None:
+        return
+
+    try:
+        await redis_client.ping()
+    except Exception as e:
+        logger.warning("redis_unavailable", error=str(e), limits="disabled")
+        await close_redis()
+        rate_limiter = None
+        stream_limiter = None
+        admission = None
+
+
+async def close_redis() -> None:
+    """Release the shared Redis connection pool."""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.connection_pool.disconnect()
+        redis_client = None
+
+
+async def get_or_create_conversation(
+    db: AsyncSession,
     conversation_id: str | None,
     user_id: str
-) -> Conversation:
-    """Get existing conversation or create new one."""
+) -> Tuple[Conversation, bool]:
+    """
+    Get existing conversation or create new one.
+
+    A new conversation is only added to the session, not committed; the caller
+    commits it together with the first message.
+
+    Returns:
+        Tuple of (conversation, created)
+    """
     if conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id == user_id
-        ).first()
+        cache_key = f"{conversation_id}:{user_id}"
+        if conversation_owner_cache.get(cache_key):
+            # Ownership already verified; callers only read .id, so skip the SELECT
+            return Conversation(id=uuid.UUID(conversation_id), user_id=uuid.UUID(user_id)), False
+
+        result = await db.execute(
+            _CONVERSATION_STMT,
+            {"conversation_id": conversation_id, "user_id": user_id}
+        )
+        conversation = result.scalar_one_or_none()
 
         if not conversation:
             raise HTTPException(404, "Conversation not found")
 
-        return conversation
+        conversation_owner_cache.set(cache_key, True)
+        return conversation, False
 
-    # Create new conversation
-    conversation = Conversation(user_id=user_id)
+    # Create new conversation (id assigned client-side so no flush is needed)
+    conversation = Conversation(id=uuid.uuid4(), user_id=user_id)
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
-    return conversation
+    return conversation, True
 
 
-def get_conversation_history(db: Session, conversation_id: str, limit: int = 10) -> List[Dict]:
+async def get_conversation_history(db: AsyncSession, conversation_id: str, limit: int = 10) -> List[Dict]:
     """Get recent messages from conversation for context."""
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at.desc()).limit(limit).all()
-
-    # Reverse to chronological order
-    messages = list(reversed(messages))
+    result = await db.execute(
+        _HISTORY_STMT,
+        {"conversation_id": conversation_id, "limit": limit}
+    )
+    rows = result.all()
 
+    # Columns only: no ORM instances or identity map entries for a read-only
+    # context window. Reverse to chronological order.
     return [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in messages
+        {"role": role.value, "content": content}
+        for role, content in reversed(rows)
     ]
 
 
-def get_prompt_for_variant(variant: str, db: Session) -> tuple[str, str]:
+# Fallback system prompts for variants without an active DB prompt version
+_DEFAULT_PROMPTS: Dict[str, str] = {
+    "control": "You are a helpful AI assistant. Provide detailed and informative responses.",
+    "concise": "You are a helpful AI assistant. Be concise and to the point.",
+    "friendly": "You are a friendly and enthusiastic AI assistant. Be warm and encouraging!",
+}
+
+
+async def get_prompt_for_variant(variant: str, db: AsyncSession) -> tuple[str, str]:
     """
     Get system prompt for an experiment variant.
 
@@ -113,29 +206,57 @@ def get_prompt_for_variant(variant: str, db: Session) -> tuple[str, str]:
         Tuple of (prompt_content, version_label)
     """
     # Try database first
-    active_prompt = (
-        db.query(PromptVersion)
-        .filter(PromptVersion.variant == variant, PromptVersion.is_active == True)
-        .first()
-    )
+    result = await db.execute(_ACTIVE_PROMPT_STMT, {"variant": variant})
+    active_prompt = result.scalars().first()
     if active_prompt:
         return active_prompt.content, f"v{active_prompt.version}"
 
     # Hardcoded fallback for backwards compatibility
-    defaults = {
-        "control": "You are a helpful AI assistant. Provide detailed and informative responses.",
-        "concise": "You are a helpful AI assistant. Be concise and to the point.",
-        "friendly": "You are a friendly and enthusiastic AI assistant. Be warm and encouraging!",
-    }
-    return defaults.get(variant, defaults["control"]), "v0"
+    return _DEFAULT_PROMPTS.get(variant, _DEFAULT_PROMPTS["control"]), "v0"
+
+
+async def save_assistant_message(
+    conversation_id: str,
+    content: str,
+    variant: str,
+    prompt_version: str,
+    metadata: Dict
+) -> uuid.UUID:
+    """
+    Persist a completed assistant response in its own session.
+
+    The request's session is closed by the time the stream finishes, so
+    this opens a fresh async session. The id is assigned client-side, so
+    no refresh is needed after the commit.
+
+    Returns:
+        ID of the saved message
+    """
+    message_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add(Message(
+            id=message_id,
+            conversation_id=conversation_id,
+            role=MessageRole.ASSISTANT,
+            content=content,
+            experiment_variant=variant,
+            model_name=metadata.get("model", settings.llm_model),
+            prompt_version=prompt_version,
+            tokens_in=metadata.get("tokens_in"),
+            tokens_out=metadata.get("tokens_out"),
+            cost=metadata.get("cost"),
+            latency_ms=metadata.get("latency_ms")
+        ))
+        await db.commit()
+    return message_id
 
 
 @router.post("/chat")
 async def chat(
     request: Request,
     chat_request: ChatRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Chat endpoint with Server-Sent Events (SSE) streaming.
@@ -149,32 +270,30 @@ async def chat(
     """
     trace_id = request.state.trace_id
 
-    # Rate limiting (skipped if Redis unavailable)
-    if rate_limiter:
-        allowed, count = rate_limiter.check_rate_limit(
+    # Rate limit + stream slot in one atomic round trip (skipped if Redis unavailable)
+    stream_id = None
+    remaining = user.rate_limit
+    if admission:
+        admitted = await admission.admit(
             str(user.id),
-            limit=user.rate_limit,
-            window=settings.rate_limit_window
+            rate_limit=user.rate_limit,
+            window=settings.rate_limit_window,
+            max_streams=settings.max_concurrent_streams_per_user
         )
 
-        if not allowed:
-            logger.warning("rate_limit_exceeded", user_id=str(user.id), count=count)
+        if not admitted.allowed:
+            logger.warning("rate_limit_exceeded", user_id=str(user.id), count=admitted.count)
             raise HTTPException(
                 status_code=429,
                 detail=f"Rate limit exceeded. Limit: {user.rate_limit} requests per hour",
                 headers={"X-RateLimit-Limit": str(user.rate_limit), "X-RateLimit-Remaining": "0"}
             )
 
-    # Atomically acquire a stream slot (skipped if Redis unavailable)
-    stream_id = None
-    if stream_limiter:
-        stream_id = stream_limiter.try_acquire_stream(str(user.id))
-        if stream_id is None:
-            current_streams = stream_limiter.get_active_stream_count(str(user.id))
+        if admitted.stream_id is None:
             logger.warning(
                 "stream_limit_exceeded",
                 user_id=str(user.id),
-                current_streams=current_streams,
+                current_streams=admitted.active_streams,
                 max_streams=settings.max_concurrent_streams_per_user
             )
             raise HTTPException(
@@ -183,6 +302,9 @@ async def chat(
                 headers={"X-Stream-Limit": str(settings.max_concurrent_streams_per_user)}
             )
 
+        stream_id = admitted.stream_id
+        remaining = admitted.remaining
+
     logger.info(
         "chat_request_received",
         user_id=str(user.id),
@@ -191,7 +313,7 @@ async def chat(
     )
 
     # Get or create conversation
-    conversation = get_or_create_conversation(
+    conversation, created = await get_or_create_conversation(
         db,
         str(chat_request.conversation_id) if chat_request.conversation_id else None,
         str(user.id)
@@ -201,12 +323,12 @@ async def chat(
     experiment_service = ExperimentService(db)
 
     # Get experiment key from config or auto-select from DB
-    experiment_key = experiment_service.get_experiment_key_for_chat(
+    experiment_key = await experiment_service.get_experiment_key_for_chat(
         settings.active_experiment_key
     )
 
     if experiment_key:
-        variant = experiment_service.assign_variant(str(user.id), experiment_key)
+        variant = await experiment_service.assign_variant(str(user.id), experiment_key)
     else:
         # No active experiments - use control
         variant = "control"
@@ -220,10 +342,10 @@ async def chat(
     )
 
     # Build prompt based on variant (DB-backed with fallback)
-    system_prompt, prompt_version = get_prompt_for_variant(variant, db)
+    system_prompt, prompt_version = await get_prompt_for_variant(variant, db)
 
-    # Get conversation history
-    history = get_conversation_history(db, str(conversation.id))
+    # Get conversation history (a new conversation has none)
+    history = [] if created else await get_conversation_history(db, str(conversation.id))
 
     # Build messages for LLM
     messages = [
@@ -232,21 +354,25 @@ async def chat(
         {"role": "user", "content": chat_request.message}
     ]
 
-    # Save user message
+    # Save user message (and the new conversation) in one transaction
     user_message = Message(
         conversation_id=conversation.id,
         role=MessageRole.USER,
         content=chat_request.message
     )
     db.add(user_message)
-    db.commit()
+
+    # Commit and pre-estimate tokens (demonstrates Rust integration) concurrently;
+    # one waits on Postgres and the other on the token counter service
+    _, estimated_tokens = await asyncio.gather(
+        db.commit(),
+        llm_service.pre_estimate_tokens(messages, settings.llm_model)
+    )
 
     # Extract conversation_id before entering generator
     # (to avoid accessing detached ORM object after session closes)
     conversation_id = str(conversation.id)
 
-    # Pre-estimate tokens (demonstrates Rust integration)
-    estimated_tokens = await llm_service.pre_estimate_tokens(messages, settings.llm_model)
     logger.info(
         "pre_estimated_tokens",
         estimated_tokens=estimated_tokens,
@@ -258,7 +384,9 @@ async def chat(
 
     # Stream response with timeout and cleanup
     async def event_stream():
-        full_content = ""
+        # Appended per token and joined once; += would copy per token
+        full_parts = []
+        content_length = 0
         metadata = {}
         stream_cancelled = False
 
@@ -272,28 +400,55 @@ async def chat(
 
             # Wrap LLM streaming with timeout
             async def stream_with_timeout():
-                nonlocal full_content, metadata
+                nonlocal content_length, metadata
                 async for token, meta in llm_service.stream_chat(messages, model=settings.llm_model):
                     if token:
-                        full_content += token
+                        full_parts.append(token)
+                        content_length += len(token)
                         yield token
                     if meta.get("done"):
                         metadata = meta
 
+            # Tokens are coalesced into fewer, larger frames; clients
+            # concatenate "token" payloads so the protocol is unchanged.
+            async def token_frames():
+                async for chunk in coalesce_tokens(
+                    stream_with_timeout(),
+                    min_chars=settings.stream_coalesce_min_chars,
+                    max_delay=settings.stream_coalesce_max_delay_ms / 1000
+                ):
+                    yield _TOKEN_FRAME_PREFIX + orjson.dumps(chunk) + _TOKEN_FRAME_SUFFIX
+
             try:
-                # Apply overall stream timeout
+                # Apply overall stream timeout; heartbeats keep idle proxies from
+                # dropping the connection while the LLM is slow to respond
                 async with asyncio.timeout(settings.stream_timeout_seconds):
-                    async for token in stream_with_timeout():
-                        yield f"data: {json.dumps({'token': token})}\n\n"
+                    async with aclosing(with_heartbeat(
+                        token_frames(),
+                        interval=settings.stream_heartbeat_seconds
+                    )) as frames:
+                        async for frame in frames:
+                            yield frame
+
+                            # Stop paying for tokens nobody will read; closing
+                            # the frames closes the upstream LLM stream
+                            if await request.is_disconnected():
+                                logger.info(
+                                    "stream_client_disconnected",
+                                    stream_id=stream_id,
+                                    content_length=content_length
+                                )
+                                stream_cancelled = True
+                                break
 
             except asyncio.TimeoutError:
                 logger.warning(
                     "stream_timeout",
                     stream_id=stream_id,
                     timeout_seconds=settings.stream_timeout_seconds,
-                    content_length=len(full_content)
+                    content_length=content_length
                 )
-                yield f"data: {json.dumps({'error': 'Stream timeout exceeded', 'partial_content': True})}\n\n"
+                yield _TIMEOUT_FRAME
                 stream_cancelled = True
 
             except asyncio.CancelledError:
@@ -301,58 +456,43 @@ async def chat(
                 logger.info(
                     "stream_client_disconnected",
                     stream_id=stream_id,
-                    content_length=len(full_content)
+                    content_length=content_length
                 )
                 stream_cancelled = True
                 raise
 
             # Save message if stream completed (even partially)
-            if full_content and not stream_cancelled:
-                from app.database import SessionLocal
-                db_new = SessionLocal()
-
-                try:
-                    assistant_message = Message(
-                        conversation_id=conversation_id,
-                        role=MessageRole.ASSISTANT,
-                        content=metadata.get("full_content", full_content),
-                        experiment_variant=variant,
-                        model_name=metadata.get("model", settings.llm_model),
-                        prompt_version=prompt_version,
-                        tokens_in=metadata.get("tokens_in"),
-                        tokens_out=metadata.get("tokens_out"),
-                        cost=metadata.get("cost"),
-                        latency_ms=metadata.get("latency_ms")
-                    )
-                    db_new.add(assistant_message)
-                    db_new.commit()
-                    db_new.refresh(assistant_message)
-
-                    logger.info(
-                        "llm_call_completed",
-                        message_id=str(assistant_message.id),
-                        stream_id=stream_id,
-                        tokens_in=metadata.get("tokens_in"),
-                        tokens_out=metadata.get("tokens_out"),
-                        latency_ms=metadata.get("latency_ms"),
-                        cost=metadata.get("cost")
-                    )
-
-                    final_data = {
-                        "done": True,
-                        "message_id": str(assistant_message.id),
-                        "conversation_id": conversation_id,
-                        "variant": variant,
-                        "model": metadata.get("model", settings.llm_model),
-                        "tokens_in": metadata.get("tokens_in"),
-                        "tokens_out": metadata.get("tokens_out"),
-                        "latency_ms": metadata.get("latency_ms"),
-                        "cost": metadata.get("cost")
-                    }
-                    yield f"data: {json.dumps(final_data)}\n\n"
-
-                finally:
-                    db_new.close()
+            if content_length and not stream_cancelled:
+                message_id = await save_assistant_message(
+                    conversation_id,
+                    content=metadata.get("full_content") or "".join(full_parts),
+                    variant=variant,
+                    prompt_version=prompt_version,
+                    metadata=metadata
+                )
+
+                logger.info(
+                    "llm_call_completed",
+                    message_id=str(message_id),
+                    stream_id=stream_id,
+                    tokens_in=metadata.get("tokens_in"),
+                    tokens_out=metadata.get("tokens_out"),
+                    latency_ms=metadata.get("latency_ms"),
+                    cost=metadata.get("cost")
+                )
+
+                final_data = {
+                    "done": True,
+                    "message_id": str(message_id),
+                    "conversation_id": conversation_id,
+                    "variant": variant,
+                    "model": metadata.get("model", settings.llm_model),
+                    "tokens_in": metadata.get("tokens_in"),
+                    "tokens_out": metadata.get("tokens_out"),
+                    "latency_ms": metadata.get("latency_ms"),
+                    "cost": metadata.get("cost")
+                }
+                yield b"data: " + orjson.dumps(final_data) + b"\n\n"
 
         except asyncio.CancelledError:
             logger.info("stream_cancelled", stream_id=stream_id)
@@ -365,17 +505,12 @@ async def chat(
                 error=str(e),
                 error_type=type(e).__name__
             )
-            yield f"data: {json.dumps({'error': 'Failed to get response from LLM'})}\n\n"
+            yield _LLM_ERROR_FRAME
 
         finally:
             # Always unregister stream on completion/error/cancel
             if stream_limiter and stream_id:
-                stream_limiter.unregister_stream(user_id_str, stream_id)
-
-    # Set rate limit headers
-    remaining = user.rate_limit
-    if rate_limiter:
-        remaining = rate_limiter.get_remaining(str(user.id), user.rate_limit, settings.rate_limit_window)
+                await stream_limiter.unregister_stream(user_id_str, stream_id)
 
     return StreamingResponse(
         event_stream(),
@@ -383,6 +518,8 @@ async def chat(
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
+            # Keeps GZipMiddleware from buffering frames to compress them
+            "Content-Encoding": "identity",
             "X-RateLimit-Limit": str(user.rate_limit),
             "X-RateLimit-Remaining": str(remaining)
         }
@@ -1,14 +1,14 @@
 """Conversation history endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from uuid import UUID
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db, get_db_ro
 from app.models.conversation import Conversation
 from app.models.message import Message, MessageRole
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
+from app.api.chat import conversation_owner_cache
 
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
@@ -17,8 +17,8 @@ router = APIRouter(prefix="/conversations", tags=["conversations"])
 async def list_conversations(
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """
     List user's conversations with preview info, newest first.
@@ -28,7 +28,7 @@ async def list_conversations(
     """
     # Subquery for message count per conversation
     msg_count_sub = (
-        db.query(
+        select(
             Message.conversation_id,
             func.count(Message.id).label("message_count"),
         )
@@ -36,35 +36,33 @@ async def list_conversations(
         .subquery()
     )
 
-    conversations = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user.id)
+    conversations = (await db.execute(
+        select(Conversation)
+        .where(Conversation.user_id == user.id)
         .order_by(Conversation.created_at.desc())
         .offset(offset)
         .limit(limit)
-        .all()
-    )
+    )).scalars().all()
 
     result = []
     for conv in conversations:
         # Get message count
-        count_row = (
-            db.query(msg_count_sub.c.message_count)
-            .filter(msg_count_sub.c.conversation_id == conv.id)
-            .first()
-        )
+        count_row = (await db.execute(
+            select(msg_count_sub.c.message_count)
+            .where(msg_count_sub.c.conversation_id == conv.id)
+        )).first()
         message_count = count_row[0] if count_row else 0
 
         # Get first user message as preview
-        first_msg = (
-            db.query(Message.content)
-            .filter(
+        first_msg = (await db.execute(
+            select(Message.content)
+            .where(
                 Message.conversation_id == conv.id,
                 Message.role == MessageRole.USER,
             )
             .order_by(Message.created_at.asc())
-            .first()
-        )
+            .limit(1)
+        )).first()
         preview = ""
         if first_msg:
             preview = first_msg[0][:80] + ("..." if len(first_msg[0]) > 80 else "")
@@ -76,10 +74,9 @@ async def list_conversations(
             "preview": preview,
         })
 
-    total = (
-        db.query(func.count(Conversation.id))
-        .filter(Conversation.user_id == user.id)
-        .scalar()
+    total = await db.scalar(
+        select(func.count(Conversation.id))
+        .where(Conversation.user_id == user.id)
     )
 
     return {"conversations": result, "total": total}
@@ -88,24 +85,22 @@ async def list_conversations(
 @router.get("/{conversation_id}/messages")
 async def get_conversation_messages(
     conversation_id: UUID,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """Get all messages for a conversation, ordered chronologically."""
-    conversation = (
-        db.query(Conversation)
-        .filter(Conversation.id == conversation_id, Conversation.user_id == user.id)
-        .first()
+    conversation = await db.scalar(
+        select(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.user_id == user.id)
     )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
+    messages = (await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
         .order_by(Message.created_at.asc())
-        .all()
-    )
+    )).scalars().all()
 
     return {
         "conversation_id": str(conversation_id),
@@ -130,17 +125,17 @@ async def get_conversation_messages(
 @router.delete("/{conversation_id}", status_code=204)
 async def delete_conversation(
     conversation_id: UUID,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete a conversation and all its messages."""
-    conversation = (
-        db.query(Conversation)
-        .filter(Conversation.id == conversation_id, Conversation.user_id == user.id)
-        .first()
+    conversation = await db.scalar(
+        select(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.user_id == user.id)
     )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    db.delete(conversation)
-    db.commit()
+    await db.delete(conversation)
+    await db.commit()
+    await conversation_owner_cache.invalidate(f"{conversation_id}:{user.id}")
@@ -1,47 +1,46 @@
 """Experiment CRUD endpoints."""
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db, get_db_ro
 from app.models.experiment import Experiment
 from app.schemas.experiment import ExperimentCreate, ExperimentUpdate, ExperimentResponse
-from app.services.experiments import ExperimentService
-from app.middleware.auth import get_current_user
+from app.services.experiments import ExperimentService, invalidate_experiment
+from app.middleware.auth import AuthenticatedUser, get_current_user
 
 router = APIRouter(prefix="/experiments", tags=["experiments"])
 
 
 @router.get("", response_model=List[ExperimentResponse])
 async def list_experiments(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """List all experiments (active and inactive), ordered by creation date."""
-    experiments = (
-        db.query(Experiment)
+    experiments = (await db.execute(
+        select(Experiment)
         .order_by(Experiment.created_at.desc())
-        .all()
-    )
+    )).scalars().all()
     return experiments
 
 
 @router.post("", response_model=ExperimentResponse, status_code=201)
 async def create_experiment(
     data: ExperimentCreate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a new experiment. Variant weights must sum to 100."""
     # Check for duplicate key
-    existing = db.query(Experiment).filter(Experiment.key == data.key).first()
+    existing = await db.scalar(select(Experiment).where(Experiment.key == data.key))
     if existing:
         raise HTTPException(status_code=409, detail=f"Experiment with key '{data.key}' already exists")
 
     service = ExperimentService(db)
-    experiment = service.create_experiment(
+    experiment = await service.create_experiment(
         key=data.key,
         description=data.description,
         variants=data.variants,
@@ -53,11 +52,11 @@ async def create_experiment(
 async def update_experiment(
     experiment_id: UUID,
     data: ExperimentUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update an experiment's description, variants, or active status."""
-    experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    experiment = await db.get(Experiment, experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="Experiment not found")
 
@@ -68,21 +67,23 @@ async def update_experiment(
     if data.active is not None:
         experiment.active = data.active
 
-    db.commit()
-    db.refresh(experiment)
+    await db.commit()
+    await db.refresh(experiment)
+    await invalidate_experiment(experiment.key)
     return experiment
 
 
 @router.delete("/{experiment_id}", status_code=204)
 async def delete_experiment(
     experiment_id: UUID,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete an experiment."""
-    experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    experiment = await db.get(Experiment, experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="Experiment not found")
 
-    db.delete(experiment)
-    db.commit()
+    await db.delete(experiment)
+    await db.commit()
+    await invalidate_experiment(experiment.key)
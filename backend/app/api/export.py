@@ -4,28 +4,27 @@ import io
 
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from datetime import datetime, timezone, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, select
+from datetime import timedelta
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db_ro, utcnow
 from app.models.message import Message, MessageRole
 from app.models.feedback import Feedback
 from app.models.conversation import Conversation
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
 
 router = APIRouter(prefix="/export", tags=["export"])
 
 
 @router.get("/experiments")
 async def export_experiment_results(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """Export experiment results as CSV (variant, messages, latency, cost, approval rate)."""
-    rows = (
-        db.query(
+    rows = (await db.execute(
+        select(
             Message.experiment_variant.label("variant"),
             func.count(Message.id).label("messages"),
             func.coalesce(func.avg(Message.latency_ms), 0).label("avg_latency_ms"),
@@ -38,14 +37,13 @@ async def export_experiment_results(
         )
         .outerjoin(Feedback, Message.id == Feedback.message_id)
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.role == MessageRole.ASSISTANT,
             Message.experiment_variant.isnot(None),
         )
         .group_by(Message.experiment_variant)
-        .all()
-    )
+    )).all()
 
     output = io.StringIO()
     writer = csv.writer(output)
@@ -76,22 +74,21 @@ async def export_experiment_results(
 @router.get("/conversations")
 async def export_conversations(
     days: int = Query(default=30, ge=1, le=365),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """Export conversation transcripts as CSV."""
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    cutoff = utcnow() - timedelta(days=days)
 
-    messages = (
-        db.query(Message, Conversation.id.label("conv_id"))
+    messages = (await db.execute(
+        select(Message, Conversation.id.label("conv_id"))
         .join(Conversation, Message.conversation_id == Conversation.id)
-        .filter(
+        .where(
             Conversation.user_id == user.id,
             Message.created_at >= cutoff,
         )
         .order_by(Conversation.created_at, Message.created_at)
-        .all()
-    )
+    )).all()
 
     output = io.StringIO()
     writer = csv.writer(output)
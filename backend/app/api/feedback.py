@@ -1,40 +1,93 @@
 """Feedback endpoints."""
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import Boolean, DateTime, Integer, Text, bindparam, case, func, literal_column, select
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_db_ro, utcnow
 from app.schemas.feedback import FeedbackRequest, FeedbackResponse
-from app.models.user import User
 from app.models.message import Message
 from app.models.feedback import Feedback
 from app.models.conversation import Conversation
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
 from app.middleware.logging import get_logger
 
 router = APIRouter()
 logger = get_logger()
 
+# Ownership check + insert-or-update in a single statement (one round trip,
+# no race between checking for existing feedback and inserting it):
+#
+#   WITH owned_message AS (SELECT ... message belonging to the user ...)
+#   INSERT INTO feedback ... SELECT ... FROM owned_message WHERE true
+#   ON CONFLICT (message_id) DO UPDATE SET rating = ..., comment = ...
+#   RETURNING xmax = 0 AS inserted, (SELECT experiment_variant ...) AS variant
+#
+# No row comes back if the message doesn't exist or belongs to someone else.
+# xmax is 0 only for freshly inserted rows, distinguishing insert from update.
+_owned_message = (
+    select(Message.id, Message.experiment_variant)
+    .join(Conversation, Message.conversation_id == Conversation.id)
+    .where(
+        Message.id == bindparam("target_message_id"),
+        Conversation.user_id == bindparam("owner_id")
+    )
+    .cte("owned_message")
+)
+# Core insert on the table: with an ORM entity, execute() parameters would be
+# treated as ORM bulk-insert rows instead of bind values. The WHERE true keeps
+# "FROM owned_message ON CONFLICT" from being parsed as a join condition.
+_feedback_insert = pg_insert(Feedback.__table__).from_select(
+    ["id", "message_id", "rating", "comment", "created_at"],
+    select(
+        bindparam("feedback_id", type_=UUID(as_uuid=True)),
+        _owned_message.c.id,
+        bindparam("rating_value", type_=Integer),
+        bindparam("comment_value", type_=Text),
+        bindparam("submitted_at", type_=DateTime)
+    ).where(literal_column("true", Boolean))
+)
+_UPSERT_FEEDBACK_STMT = _feedback_insert.on_conflict_do_update(
+    index_elements=[Feedback.__table__.c.message_id],
+    set_={
+        "rating": _feedback_insert.excluded.rating,
+        "comment": _feedback_insert.excluded.comment
+    }
+).returning(
+    literal_column("xmax = 0", Boolean).label("inserted"),
+    select(_owned_message.c.experiment_variant).scalar_subquery().label("variant")
+)
+
 
 @router.post("/feedback", response_model=FeedbackResponse)
 async def submit_feedback(
     feedback_request: FeedbackRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Submit feedback (thumbs up/down) for an assistant message.
 
     - Validates that the message exists and belongs to the user
-    - Prevents duplicate feedback on the same message
+    - Updates existing feedback instead of creating a duplicate
     - Logs feedback for analytics
     """
-    # Validate message exists and belongs to user
-    message = db.query(Message).join(Conversation).filter(
-        Message.id == feedback_request.message_id,
-        Conversation.user_id == user.id
-    ).first()
+    result = await db.execute(
+        _UPSERT_FEEDBACK_STMT,
+        {
+            "target_message_id": feedback_request.message_id,
+            "owner_id": user.id,
+            "feedback_id": uuid.uuid4(),
+            "rating_value": feedback_request.rating,
+            "comment_value": feedback_request.comment,
+            "submitted_at": utcnow()
+        }
+    )
+    row = result.first()
 
-    if not message:
+    if row is None:
         logger.warning(
             "feedback_invalid_message",
             user_id=str(user.id),
@@ -45,23 +98,15 @@ async def submit_feedback(
             detail="Message not found or does not belong to you"
         )
 
-    # Check if feedback already exists
-    existing_feedback = db.query(Feedback).filter(
-        Feedback.message_id == feedback_request.message_id
-    ).first()
-
-    if existing_feedback:
-        # Update existing feedback
-        existing_feedback.rating = feedback_request.rating
-        existing_feedback.comment = feedback_request.comment
-        db.commit()
+    await db.commit()
 
+    if not row.inserted:
         logger.info(
             "feedback_updated",
             user_id=str(user.id),
             message_id=str(feedback_request.message_id),
             rating=feedback_request.rating,
-            variant=message.experiment_variant
+            variant=row.variant
         )
 
         return FeedbackResponse(
@@ -69,21 +114,12 @@ async def submit_feedback(
             message="Feedback updated"
         )
 
-    # Create new feedback
-    feedback = Feedback(
-        message_id=feedback_request.message_id,
-        rating=feedback_request.rating,
-        comment=feedback_request.comment
-    )
-    db.add(feedback)
-    db.commit()
-
     logger.info(
         "feedback_received",
         user_id=str(user.id),
         message_id=str(feedback_request.message_id),
         rating=feedback_request.rating,
-        variant=message.experiment_variant,
+        variant=row.variant,
         has_comment=bool(feedback_request.comment)
     )
 
@@ -95,26 +131,27 @@ async def submit_feedback(
 
 @router.get("/feedback/stats")
 async def get_feedback_stats(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """
     Get feedback statistics (admin/analytics endpoint).
 
     Returns aggregated stats by experiment variant.
     """
-    from sqlalchemy import func
-
-    stats = db.query(
-        Message.experiment_variant,
-        func.count(Feedback.id).label('total_feedback'),
-        func.sum(func.case((Feedback.rating == 1, 1), else_=0)).label('thumbs_up'),
-        func.sum(func.case((Feedback.rating == -1, 1), else_=0)).label('thumbs_down')
-    ).outerjoin(Feedback, Message.id == Feedback.message_id)\
-     .join(Conversation, Message.conversation_id == Conversation.id)\
-     .filter(Conversation.user_id == user.id)\
-     .group_by(Message.experiment_variant)\
-     .all()
+    result = await db.execute(
+        select(
+            Message.experiment_variant,
+            func.count(Feedback.id).label('total_feedback'),
+            func.sum(case((Feedback.rating == 1, 1), else_=0)).label('thumbs_up'),
+            func.sum(case((Feedback.rating == -1, 1), else_=0)).label('thumbs_down')
+        )
+        .outerjoin(Feedback, Message.id == Feedback.message_id)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .where(Conversation.user_id == user.id)
+        .group_by(Message.experiment_variant)
+    )
+    stats = result.all()
 
     result = []
     for variant, total, thumbs_up, thumbs_down in stats:
@@ -1,42 +1,61 @@
 """Health check endpoints."""
 import logging
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import redis
 
-from app.database import get_db
+from app.api import chat
+from app.api.responses import StaticJSON
+from app.database import get_db_ro
 from app.config import get_settings
 
 router = APIRouter()
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Shared Redis client for health checks
-_redis_client: redis.Redis | None = None
+# Set once deferred startup work (schema, cache warm-up) has finished
+READY = False
 
 
-def _get_redis_client() -> redis.Redis | None:
-    """Get or create a shared Redis client for health checks."""
-    global _redis_client
-    if _redis_client is None and settings.redis_url:
-        try:
-            _redis_client = redis.from_url(settings.redis_url)
-        except Exception:
-            pass
-    return _redis_client
+def mark_ready() -> None:
+    """Report the app as ready to serve traffic on /health/ready."""
+    global READY
+    READY = True
+
+
+# no-cache: proxies may keep it but must revalidate, so every probe still
+# reaches this process (answered with a bodiless 304 when unchanged)
+_HEALTHY = StaticJSON(
+    {"status": "healthy", "service": "promptlab-backend"},
+    cache_control="no-cache"
+)
 
 
 @router.get("/health")
 @router.head("/health")
-async def health_check():
+async def health_check(request: Request):
     """Basic health check."""
-    return {"status": "healthy", "service": "promptlab-backend"}
+    return _HEALTHY.response(request)
+
+
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and accepting connections."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until deferred startup work has finished."""
+    if not READY:
+        return ORJSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
 
 
 @router.get("/health/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+async def detailed_health_check(db: AsyncSession = Depends(get_db_ro)):
     """
     Detailed health check including database and Redis connectivity.
     """
@@ -48,21 +67,24 @@ async def detailed_health_check(db: Session = Depends(get_db)):
 
     # Check database
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         checks["database"] = "healthy"
     except Exception as e:
         logger.warning("Health check: database unhealthy: %s", e)
         checks["database"] = "unhealthy"
 
-    # Check Redis (optional)
-    client = _get_redis_client()
+    # Check Redis (optional) on the pooled client shared with the limiters
+    client = chat.redis_client
     if client:
         try:
-            client.ping()
+            await client.ping()
             checks["redis"] = "healthy"
         except Exception as e:
             logger.warning("Health check: redis unhealthy: %s", e)
             checks["redis"] = "unhealthy"
+    elif settings.redis_url:
+        # Configured but disabled at startup (unreachable or invalid URL)
+        checks["redis"] = "unhealthy"
 
     # Overall status
     overall_status = "healthy" if all(
@@ -1,45 +1,42 @@
 """Prompt version registry endpoints."""
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
 from typing import List
 from uuid import UUID
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db, get_db_ro
 from app.models.prompt_version import PromptVersion
 from app.schemas.prompt import PromptCreate, PromptResponse
-from app.middleware.auth import get_current_user
+from app.middleware.auth import AuthenticatedUser, get_current_user
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
 
 @router.get("", response_model=List[PromptResponse])
 async def list_prompts(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """List all prompt versions, newest first."""
-    return (
-        db.query(PromptVersion)
+    return (await db.execute(
+        select(PromptVersion)
         .order_by(PromptVersion.variant, PromptVersion.version.desc())
-        .all()
-    )
+    )).scalars().all()
 
 
 @router.get("/{variant}", response_model=List[PromptResponse])
 async def get_variant_history(
     variant: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_ro),
 ):
     """Get version history for a specific variant, newest first."""
-    versions = (
-        db.query(PromptVersion)
-        .filter(PromptVersion.variant == variant)
+    versions = (await db.execute(
+        select(PromptVersion)
+        .where(PromptVersion.variant == variant)
         .order_by(PromptVersion.version.desc())
-        .all()
-    )
+    )).scalars().all()
     if not versions:
         raise HTTPException(status_code=404, detail=f"No prompts found for variant '{variant}'")
     return versions
@@ -48,8 +45,8 @@ async def get_variant_history(
 @router.post("", response_model=PromptResponse, status_code=201)
 async def create_prompt_version(
     data: PromptCreate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Create a new prompt version for a variant.
@@ -58,18 +55,21 @@ async def create_prompt_version(
     Previous active version for this variant is deactivated.
     """
     # Get next version number for this variant
-    max_version = (
-        db.query(func.max(PromptVersion.version))
-        .filter(PromptVersion.variant == data.variant)
-        .scalar()
+    max_version = await db.scalar(
+        select(func.max(PromptVersion.version))
+        .where(PromptVersion.variant == data.variant)
     )
     next_version = (max_version or 0) + 1
 
     # Deactivate current active version for this variant
-    db.query(PromptVersion).filter(
-        PromptVersion.variant == data.variant,
-        PromptVersion.is_active == True,
-    ).update({"is_active": False})
+    await db.execute(
+        update(PromptVersion)
+        .where(
+            PromptVersion.variant == data.variant,
+            PromptVersion.is_active == True,
+        )
+        .values(is_active=False)
+    )
 
     # Create new version
     prompt = PromptVersion(
@@ -79,34 +79,38 @@ async def create_prompt_version(
         is_active=True,
     )
     db.add(prompt)
-    db.commit()
-    db.refresh(prompt)
+    await db.commit()
+    await db.refresh(prompt)
     return prompt
 
 
 @router.patch("/{prompt_id}/activate", response_model=PromptResponse)
 async def activate_prompt_version(
     prompt_id: UUID,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Activate a specific prompt version (rollback).
 
     Deactivates all other versions for the same variant.
     """
-    prompt = db.query(PromptVersion).filter(PromptVersion.id == prompt_id).first()
+    prompt = await db.get(PromptVersion, prompt_id)
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt version not found")
 
     # Deactivate all versions for this variant
-    db.query(PromptVersion).filter(
-        PromptVersion.variant == prompt.variant,
-        PromptVersion.is_active == True,
-    ).update({"is_active": False})
+    await db.execute(
+        update(PromptVersion)
+        .where(
+            PromptVersion.variant == prompt.variant,
+            PromptVersion.is_active == True,
+        )
+        .values(is_active=False)
+    )
 
     # Activate the selected version
     prompt.is_active = True
-    db.commit()
-    db.refresh(prompt)
+    await db.commit()
+    await db.refresh(prompt)
     return prompt
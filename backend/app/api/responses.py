@@ -0,0 +1,35 @@
+"""Precomputed responses for endpoints with static payloads."""
+import hashlib
+from typing import Any, Dict
+
+import orjson
+from fastapi import Request, Response
+
+
+class StaticJSON:
+    """
+    A JSON payload serialized once at import and served with an ETag.
+
+    Clients and proxies that send the ETag back in If-None-Match get an
+    empty 304 instead of the body.
+    """
+
+    def __init__(self, content: Dict[str, Any], cache_control: str):
+        self.body = orjson.dumps(content)
+        self.etag = f'"{hashlib.md5(self.body, usedforsecurity=False).hexdigest()}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control}
+
+    def response(self, request: Request) -> Response:
+        """Return the payload, or 304 if the client already has this version."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self._matches(if_none_match):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+    def _matches(self, if_none_match: str) -> bool:
+        """Weak comparison against an If-None-Match list (RFC 9110)."""
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
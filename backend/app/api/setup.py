@@ -1,22 +1,32 @@
 """Setup endpoint for database initialization."""
 import secrets
 import logging
+import uuid
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy import literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from app.database import SessionLocal
+from app.database import get_db
 from app.models import User, Experiment
 from app.middleware.auth import hash_api_key
+from app.services.experiments import invalidate_experiment
 from app.config import get_settings
 
 router = APIRouter()
 settings = get_settings()
 
+# Fixed id for the seeded user, so repeated or concurrent setup calls
+# conflict on the primary key instead of racing past an emptiness check
+SEED_USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
 
 @router.post("/setup/init-db")
 async def initialize_database(
     x_bootstrap_token: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Initialize database and seed initial data.
@@ -32,60 +42,70 @@ async def initialize_database(
         if not x_bootstrap_token or x_bootstrap_token != settings.bootstrap_token:
             raise HTTPException(status_code=403, detail="Invalid bootstrap token.")
 
-    db = SessionLocal()
-
     try:
         # Tables must already exist via Alembic — don't create_all here
-        existing_user = db.query(User).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=409,
-                detail="Database already initialized."
-            )
 
         # Generate a secure random API key
         generated_api_key = f"pk-{secrets.token_urlsafe(32)}"
         api_key_hash = hash_api_key(generated_api_key)
 
-        user = User(
-            api_key_hash=api_key_hash,
-            rate_limit=100
+        # Seed the first user only if the table is empty, in the same
+        # statement; RETURNING yields nothing if it already was initialized
+        users = User.__table__
+        user_id = await db.scalar(
+            pg_insert(users)
+            .from_select(
+                ["id", "api_key_hash", "rate_limit"],
+                select(
+                    literal(SEED_USER_ID, users.c.id.type),
+                    literal(api_key_hash, users.c.api_key_hash.type),
+                    literal(100, users.c.rate_limit.type),
+                ).where(~select(users.c.id).exists())
+            )
+            .on_conflict_do_nothing(index_elements=[users.c.id])
+            .returning(users.c.id)
         )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        if user_id is None:
+            raise HTTPException(
+                status_code=409,
+                detail="Database already initialized."
+            )
 
-        # Create sample experiment
-        experiment = Experiment(
-            key="prompt_experiment_v1",
-            description="Test concise vs detailed prompts",
-            variants={
-                "control": 34,
-                "concise": 33,
-                "friendly": 33
-            },
-            active=True
+        # Create sample experiment (kept if a previous attempt created it)
+        experiment_key = "prompt_experiment_v1"
+        await db.execute(
+            pg_insert(Experiment)
+            .values(
+                key=experiment_key,
+                description="Test concise vs detailed prompts",
+                variants={
+                    "control": 34,
+                    "concise": 33,
+                    "friendly": 33
+                },
+                active=True
+            )
+            .on_conflict_do_nothing(index_elements=[Experiment.key])
         )
-        db.add(experiment)
-        db.commit()
+        await db.commit()
+        # Workers may have cached "no active experiment" at startup
+        await invalidate_experiment(experiment_key)
 
         return {
             "status": "success",
             "message": "Database initialized successfully",
-            "user_id": str(user.id),
+            "user_id": str(user_id),
             "api_key": generated_api_key,
-            "experiment": experiment.key,
+            "experiment": experiment_key,
             "note": "Save your API key! This is the only time it will be shown."
         }
 
     except HTTPException:
         raise
     except Exception:
-        db.rollback()
+        await db.rollback()
         logging.exception("Database initialization failed")
         raise HTTPException(
             status_code=500,
             detail="Database initialization failed. Check server logs for details."
         )
-    finally:
-        db.close()
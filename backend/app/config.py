@@ -1,6 +1,5 @@
 """Application configuration."""
-from pydantic_settings import BaseSettings
-from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -12,9 +11,14 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    db_pool_size: int = 20  # Connections kept open per worker
+    db_max_overflow: int = 20  # Extra connections allowed under burst load
+    db_pool_recycle: int = 1800  # seconds - reconnect before server-side idle timeouts
+    db_pool_timeout: int = 30  # seconds - wait for a free connection before failing
 
     # Redis (optional — rate limiting is skipped when unavailable)
     redis_url: str = ""
+    redis_max_connections: int = 64
 
     # OpenAI
     openai_api_key: str
@@ -35,6 +39,9 @@ class Settings(BaseSettings):
     max_concurrent_streams_per_user: int = 5  # Max simultaneous streams per user
     stream_timeout_seconds: int = 120  # Max duration for a single stream
     llm_response_timeout_seconds: int = 60  # Timeout for LLM provider response
+    stream_coalesce_min_chars: int = 32  # Flush a token chunk once it reaches this size
+    stream_coalesce_max_delay_ms: int = 30  # ...or this long after its first token
+    stream_heartbeat_seconds: int = 15  # Keep-alive comment frame interval while idle
 
     # Bootstrap token for /setup/init-db (required to initialize the database)
     bootstrap_token: str = ""
@@ -44,12 +51,19 @@ class Settings(BaseSettings):
     token_counter_enabled: bool = True
     token_counter_timeout: float = 0.5  # seconds - fail fast to avoid blocking
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # Frozen: settings are read everywhere and must not change at runtime
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=False,
+        frozen=True,
+        extra="ignore"
+    )
+
+
+# Loaded once at import; every module shares this instance
+settings = Settings()
 
 
-@lru_cache()
 def get_settings() -> Settings:
-    """Get cached settings instance."""
-    return Settings()
+    """Get the shared settings instance."""
+    return settings
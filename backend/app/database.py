@@ -1,38 +1,128 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
+import asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timezone
+from typing import AsyncGenerator
 
 from app.config import get_settings
 
 settings = get_settings()
 
-# Create database engine
+# Shared pool settings; connections open lazily, so the mostly idle sync
+# engine never actually grows to pool_size.
+_pool_options = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    pool_pre_ping=True,
+)
+
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a Postgres URL to use the asyncpg driver."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# Sync engine: schema creation at startup and standalone scripts (init_db.py)
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
-    echo=settings.debug
+    echo=settings.debug,
+    **_pool_options
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers, so queries never block the event loop
+async_engine = create_async_engine(
+    get_async_database_url(settings.database_url),
+    echo=settings.debug,
+    **_pool_options
+)
+
+# expire_on_commit=False keeps attributes loaded after commit; async sessions
+# cannot lazy-load them again outside an awaited call.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read-only handlers: same pool, but in autocommit mode, so a request's
+# queries run without the BEGIN/ROLLBACK round trips a transaction costs.
+# Anything written through these sessions commits immediately; use get_db.
+read_engine = async_engine.execution_options(isolation_level="AUTOCOMMIT")
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+def utcnow() -> datetime:
+    """
+    Current UTC time as a naive datetime.
+
+    Timestamp columns are TIMESTAMP WITHOUT TIME ZONE holding UTC; asyncpg
+    rejects timezone-aware values for them.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def prewarm_pool(count: int) -> None:
     """
-    Dependency to get database session.
+    Open count async connections at once and return them to the pool.
+
+    Moves connection setup (TCP, auth, asyncpg type introspection) from the
+    first requests after a deploy to startup.
+    """
+    results = await asyncio.gather(
+        *(async_engine.connect() for _ in range(count)),
+        return_exceptions=True
+    )
+    connections = [r for r in results if not isinstance(r, BaseException)]
+    try:
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in connections))
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        raise errors[0]
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get an async database session.
 
     Usage:
         @app.get("/users")
-        def get_users(db: Session = Depends(get_db)):
-            return db.query(User).all()
+        async def get_users(db: AsyncSession = Depends(get_db)):
+            result = await db.execute(select(User))
+            return result.scalars().all()
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_db_ro() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get an autocommit session for read-only handlers.
+
+    Usage:
+        @app.get("/stats")
+        async def get_stats(db: AsyncSession = Depends(get_db_ro)):
+            return await db.scalar(select(func.count(Message.id)))
+    """
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,44 +1,172 @@
 """Main FastAPI application."""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager, suppress
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from sqlalchemy.orm import configure_mappers
 import logging
 import asyncio
-import httpx
 
 from app.config import get_settings
-from app.middleware.logging import LoggingMiddleware
+from app.middleware.logging import LoggingMiddleware, start_log_listener, stop_log_listener
 from app.api import chat, feedback, health, setup, analytics, experiments, conversations, prompts, api_keys, export
+from app.api.responses import StaticJSON
 from app.services.token_counter import close_token_counter
-from app.database import engine, Base
+from app.services.cache import listen_for_invalidations
+from app.services.experiments import refresh_chat_experiment, refresh_experiments_periodically
+from app.database import engine, Base, prewarm_pool
 
 settings = get_settings()
 
 # Keep-alive task for Render free tier
 keep_alive_task = None
+# Cross-worker cache invalidation listener (only when Redis is available)
+cache_invalidation_task = None
+# Keeps the chat experiment cached so requests skip the lookup
+experiment_refresh_task = None
+# Schema creation and cache warm-up, run once the server is listening
+deferred_init_task = None
+
+# Retry delay while the database is unreachable during deferred init
+DEFERRED_INIT_RETRY_SECONDS = 5
+
+# Render free tier sleeps services after 15 minutes idle
+KEEP_ALIVE_INTERVAL_SECONDS = 600
 
 async def keep_alive_ping():
     """Ping the Rust token counter service every 10 minutes to prevent sleep."""
+    loop = asyncio.get_running_loop()
+    # Sleep until fixed deadlines rather than a flat 600s after each ping, so
+    # time spent pinging doesn't push later pings back
+    next_deadline = loop.time() + KEEP_ALIVE_INTERVAL_SECONDS
     while True:
-        await asyncio.sleep(600)  # 10 minutes
+        await asyncio.sleep(max(0.0, next_deadline - loop.time()))
+        next_deadline += KEEP_ALIVE_INTERVAL_SECONDS
         if settings.token_counter_enabled and settings.token_counter_url:
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(f"{settings.token_counter_url}/health")
-                    if response.status_code == 200:
-                        logging.info("Keep-alive ping to token counter: OK")
-                    else:
-                        logging.warning("Keep-alive ping failed: %d", response.status_code)
+                # Reuses the chat path's pooled client, keeping its connection warm
+                status_code = await chat.token_counter.ping(timeout=10.0)
+                if status_code == 200:
+                    logging.info("Keep-alive ping to token counter: OK")
+                else:
+                    logging.warning("Keep-alive ping failed: %d", status_code)
             except Exception as e:
                 logging.warning("Keep-alive ping error: %s", e)
 
+# Held by the replica creating tables; expires in case that replica dies
+SCHEMA_LOCK_KEY = "promptlab:schema_init_lock"
+SCHEMA_LOCK_TTL_SECONDS = 60
+# How often a replica that lost the lock checks whether the tables exist
+SCHEMA_POLL_SECONDS = 1
+
+
+def schema_exists() -> bool:
+    """Whether every mapped table exists (sync; run in a worker thread)."""
+    inspector = inspect(engine)
+    return all(inspector.has_table(table.name) for table in Base.metadata.sorted_tables)
+
+
+async def ensure_schema():
+    """
+    Create missing tables once per deployment, without blocking the event loop.
+
+    create_all introspects pg_catalog with the sync engine, so it runs in a
+    worker thread. With Redis, a SET NX lock lets only one replica run it;
+    the others wait until the tables exist, so they don't report ready (or
+    query) while the schema is still being created. If the lock holder
+    fails it releases the lock and a waiting replica takes over.
+    """
+    if chat.redis_client is not None:
+        waiting_logged = False
+        while True:
+            try:
+                acquired = await chat.redis_client.set(
+                    SCHEMA_LOCK_KEY, "1", nx=True, ex=SCHEMA_LOCK_TTL_SECONDS
+                )
+            except Exception as e:
+                logging.warning("Schema lock unavailable, creating tables anyway: %s", e)
+                acquired = True
+            if acquired:
+                break
+            if await asyncio.to_thread(schema_exists):
+                return
+            if not waiting_logged:
+                logging.info("Schema initialization held by another replica, waiting")
+                waiting_logged = True
+            await asyncio.sleep(SCHEMA_POLL_SECONDS)
+
+    # Replicas without Redis can still race on CREATE TABLE/TYPE; the loser
+    # finds the objects already there, which is the state we want.
+    try:
+        with suppress(ProgrammingError, IntegrityError):
+            await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    except Exception:
+        # Release the lock so a retry (here or on another replica) can run
+        if chat.redis_client is not None:
+            with suppress(Exception):
+                await chat.redis_client.delete(SCHEMA_LOCK_KEY)
+        raise
+
+
+async def deferred_init():
+    """
+    Finish startup work that needs the database, then mark the app ready.
+
+    Runs after the port is bound so slow free-tier Postgres cannot push
+    startup past the platform's health check timeout. /health/live answers
+    right away; /health/ready returns 503 until this completes.
+    """
+    while True:
+        try:
+            await ensure_schema()
+            break
+        except Exception as e:
+            logging.warning("Schema initialization failed, retrying: %s", e)
+            await asyncio.sleep(DEFERRED_INIT_RETRY_SECONDS)
+
+    # Resolve relationships now rather than on the first query
+    configure_mappers()
+    try:
+        await prewarm_pool(settings.db_pool_size // 2)
+    except Exception as e:
+        logging.warning("Connection pool warm-up failed: %s", e)
+
+    try:
+        await refresh_chat_experiment(settings.active_experiment_key)
+    except Exception as e:
+        logging.warning("Experiment cache warm-up failed: %s", e)
+
+    health.mark_ready()
+    logging.info("PromptLab ready")
+
+    # Open the token counter connection (TLS + HTTP/2 settings exchange) now
+    # rather than on the first chat. Runs after readiness so a sleeping
+    # free-tier service can't hold up startup.
+    if settings.token_counter_enabled and settings.token_counter_url:
+        try:
+            await chat.token_counter.ping(timeout=10.0)
+        except Exception as e:
+            logging.warning("Token counter warm-up failed: %s", e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan - startup and shutdown."""
-    global keep_alive_task
+    global keep_alive_task, cache_invalidation_task, experiment_refresh_task, deferred_init_task
 
-    # Startup — ensure all tables exist (safe: checkfirst=True is default)
-    Base.metadata.create_all(bind=engine)
+    start_log_listener()
+
+    # Startup — tables are ensured in the background (checkfirst=True is default)
+    await chat.init_redis()
+    if chat.redis_client is not None:
+        cache_invalidation_task = asyncio.create_task(listen_for_invalidations(chat.redis_client))
+    deferred_init_task = asyncio.create_task(deferred_init())
+    experiment_refresh_task = asyncio.create_task(
+        refresh_experiments_periodically(settings.active_experiment_key)
+    )
     logging.info("PromptLab starting up")
 
     # Start keep-alive task for Render free tier
@@ -47,15 +175,20 @@ async def lifespan(app: FastAPI):
 
     yield  # App runs here
 
-    # Shutdown
+    # Shutdown. Stop the background tasks first: keep-alive and deferred init
+    # may be mid-ping, and the token counter rebuilds its pool on next use.
+    for task in (keep_alive_task, cache_invalidation_task, experiment_refresh_task, deferred_init_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
     await close_token_counter()
-    if keep_alive_task:
-        keep_alive_task.cancel()
-        try:
-            await keep_alive_task
-        except asyncio.CancelledError:
-            pass
+    await chat.llm_service.close()
+    await chat.close_redis()
     logging.info("Shutting down PromptLab")
+    stop_log_listener()
 
 # Create FastAPI app
 app = FastAPI(
@@ -64,13 +197,24 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    # orjson instead of stdlib json for every dict an endpoint returns
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
-# CORS middleware - Origins driven by configuration
-allowed_origins = [settings.frontend_url]
+# Compress larger JSON responses (stats, exports). SSE responses opt out by
+# setting Content-Encoding: identity, since gzip would buffer the stream.
+# Added first so it sits innermost and sees whole bodies before the
+# BaseHTTPMiddleware layers below re-chunk them (which defeats minimum_size).
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# CORS middleware - Origins driven by configuration. A set drops the
+# duplicate when frontend_url is one of the dev origins; CORSMiddleware keeps
+# it as given and only tests membership, so lookups stay O(1).
+allowed_origins = {settings.frontend_url}
 if settings.debug:
-    allowed_origins += ["http://localhost:5173", "http://localhost:3000"]
+    allowed_origins |= {"http://localhost:5173", "http://localhost:3000"}
+allowed_origins = frozenset(allowed_origins)
 
 app.add_middleware(
     CORSMiddleware,
@@ -136,10 +280,9 @@ app.include_router(api_keys.router)
 app.include_router(export.router)
 
 
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {
+# Static for the life of the process, so serialize it once
+_ROOT = StaticJSON(
+    {
         "service": "PromptLab",
         "version": "0.1.0",
         "docs": "/docs" if settings.debug else "disabled",
@@ -148,10 +291,15 @@ async def root():
             "chat": "POST /chat",
             "feedback": "POST /feedback"
         }
-    }
-
+    },
+    cache_control="public, max-age=300"
+)
 
 
+@app.get("/")
+async def root(request: Request):
+    """Root endpoint."""
+    return _ROOT.response(request)
 
 
-# uvicorn app.main:app --reload
\ No newline at end of file
+# uvicorn app.main:app --reload
@@ -10,17 +10,40 @@ Note: API keys use SHA256 (not bcrypt) because:
 - The api_key_hash column is indexed for O(1) database lookup
 """
 import hashlib
+import uuid
+from datetime import datetime
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import APIKeyHeader
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import NamedTuple, Optional
 
-from app.database import get_db
+from app.database import get_db_ro
 from app.models.user import User
+from app.services.cache import LocalCache
 
 # API key header
 api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
 
+# Built once; runs on every authenticated request that misses the cache
+_USER_BY_KEY_HASH_STMT = select(
+    User.id, User.api_key_hash, User.rate_limit, User.created_at
+).where(User.api_key_hash == bindparam("api_key_hash"))
+
+
+class AuthenticatedUser(NamedTuple):
+    """Cached, session-independent view of the user behind an API key."""
+
+    id: uuid.UUID
+    api_key_hash: str
+    rate_limit: int
+    created_at: datetime
+
+
+# API key hash -> AuthenticatedUser, shared by all requests in this worker.
+# Only valid keys are cached; rotation invalidates the old hash everywhere.
+authenticated_user_cache = LocalCache("authenticated_user", maxsize=10_000, ttl=60)
+
 
 def hash_api_key(api_key: str) -> str:
     """
@@ -42,18 +65,19 @@ def hash_api_key(api_key: str) -> str:
 
 async def get_current_user(
     api_key: Optional[str] = Security(api_key_header),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db_ro)
+) -> AuthenticatedUser:
     """
     Dependency to validate API key and get current user.
 
-    Uses direct database lookup by hashed API key for O(1) performance.
+    Recently seen keys are served from an in-process cache. Otherwise uses
+    direct database lookup by hashed API key for O(1) performance.
     The api_key_hash column is indexed, making this query fast even with
     millions of users.
 
     Usage:
         @router.get("/protected")
-        def protected_route(user: User = Depends(get_current_user)):
+        def protected_route(user: AuthenticatedUser = Depends(get_current_user)):
             return {"user_id": user.id}
 
     Raises:
@@ -70,21 +94,29 @@ async def get_current_user(
     # This is O(1) with the indexed api_key_hash column
     api_key_hash = hash_api_key(api_key)
 
-    user = db.query(User).filter(
-        User.api_key_hash == api_key_hash
-    ).first()
+    user = authenticated_user_cache.get(api_key_hash)
+    if user is not None:
+        return user
+
+    result = await db.execute(_USER_BY_KEY_HASH_STMT, {"api_key_hash": api_key_hash})
+    row = result.one_or_none()
+    # Hand the connection back now rather than holding it while the rest of
+    # the endpoint runs; the session itself lives until the endpoint returns
+    await db.commit()
 
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=401,
             detail="Invalid API key",
             headers={"WWW-Authenticate": "ApiKey"}
         )
 
+    user = AuthenticatedUser(*row)
+    authenticated_user_cache.set(api_key_hash, user)
     return user
 
 
-def create_user_with_api_key(db: Session, api_key: str, rate_limit: int = 100) -> User:
+async def create_user_with_api_key(db: AsyncSession, api_key: str, rate_limit: int = 100) -> User:
     """
     Helper to create a new user with an API key.
 
@@ -103,6 +135,6 @@ def create_user_with_api_key(db: Session, api_key: str, rate_limit: int = 100) -
         rate_limit=rate_limit
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
@@ -1,25 +1,50 @@
 """Structured logging middleware with correlation IDs."""
 import structlog
-import uuid
+import orjson
+import secrets
 import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
 import time
 
 
-# Configure structured logging
+# While the app runs, log lines are handed to a background thread for
+# writing, so the event loop only enqueues. Outside the lifespan (scripts,
+# tests, a TestClient used without "with") nothing drains the queue, so lines
+# are written to stdout directly until start_log_listener swaps the handlers.
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_log_queue: queue.Queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+_stdlib_logger = logging.getLogger("promptlab")
+_stdlib_logger.addHandler(_stdout_handler)
+_stdlib_logger.setLevel(logging.INFO)
+_stdlib_logger.propagate = False
+_log_listener = QueueListener(_log_queue, _stdout_handler)
+
+
+def _dumps(event_dict, **kwargs) -> str:
+    # The stdlib logger wants str; orjson hands back bytes
+    return orjson.dumps(event_dict, **kwargs).decode()
+
+
+# Configure structured logging. This runs at import so it is in place before
+# any logger is first used: with cache_logger_on_first_use, each logger
+# freezes the configuration it sees on its first call.
 structlog.configure(
     processors=[
         structlog.contextvars.merge_contextvars,
         structlog.processors.add_log_level,
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer()
+        structlog.processors.JSONRenderer(serializer=_dumps)
     ],
     wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
     context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
-    cache_logger_on_first_use=False
+    logger_factory=lambda *args: _stdlib_logger,
+    cache_logger_on_first_use=True
 )
 
 logger = structlog.get_logger()
@@ -33,53 +58,66 @@ class LoggingMiddleware(BaseHTTPMiddleware):
     """
 
     async def dispatch(self, request: Request, call_next: Callable):
-        # Generate correlation ID
-        trace_id = str(uuid.uuid4())
+        # Generate correlation ID (128-bit hex, same shape as a W3C trace-id)
+        trace_id = secrets.token_hex(16)
         request.state.trace_id = trace_id
 
-        # Bind trace_id to structlog context
-        structlog.contextvars.clear_contextvars()
-        structlog.contextvars.bind_contextvars(trace_id=trace_id)
-
-        # Log request
-        logger.info(
-            "request_started",
-            method=request.method,
-            path=request.url.path,
-            client_ip=request.client.host if request.client else None
-        )
-
-        # Process request and measure latency
-        start_time = time.time()
-        try:
-            response = await call_next(request)
-            latency_ms = int((time.time() - start_time) * 1000)
-
-            # Log response
+        # Bind trace_id to structlog context for this request only; the
+        # previous values are restored on exit, so nothing needs clearing
+        with structlog.contextvars.bound_contextvars(trace_id=trace_id):
+            # Log request
             logger.info(
-                "request_completed",
-                status_code=response.status_code,
-                latency_ms=latency_ms
+                "request_started",
+                method=request.method,
+                path=request.url.path,
+                client_ip=request.client.host if request.client else None
             )
 
-            # Add trace ID to response headers
-            response.headers["X-Trace-ID"] = trace_id
+            # Process request and measure latency
+            start_time = time.perf_counter()
+            try:
+                response = await call_next(request)
+                latency_ms = int((time.perf_counter() - start_time) * 1000)
 
-            return response
+                # Log response
+                logger.info(
+                    "request_completed",
+                    status_code=response.status_code,
+                    latency_ms=latency_ms
+                )
 
-        except Exception as e:
-            latency_ms = int((time.time() - start_time) * 1000)
+                # Add trace ID to response headers
+                response.headers["X-Trace-ID"] = trace_id
 
-            # Log error
-            logger.error(
-                "request_failed",
-                error=str(e),
-                error_type=type(e).__name__,
-                latency_ms=latency_ms
-            )
-            raise
+                return response
+
+            except Exception as e:
+                latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+                # Log error
+                logger.error(
+                    "request_failed",
+                    error=str(e),
+                    error_type=type(e).__name__,
+                    latency_ms=latency_ms
+                )
+                raise
 
 
 def get_logger():
     """Get configured structured logger."""
     return logger
+
+
+def start_log_listener() -> None:
+    """Start writing log lines to stdout from a background thread."""
+    _log_listener.start()
+    _stdlib_logger.addHandler(_queue_handler)
+    _stdlib_logger.removeHandler(_stdout_handler)
+
+
+def stop_log_listener() -> None:
+    """Write directly to stdout again, then flush the queue and stop the writer thread."""
+    _stdlib_logger.addHandler(_stdout_handler)
+    _stdlib_logger.removeHandler(_queue_handler)
+    _log_listener.stop()
@@ -2,10 +2,9 @@
 from sqlalchemy import Column, String, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 import uuid
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class Conversation(Base):
@@ -15,7 +14,7 @@ class Conversation(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
     extra_data = Column(JSONB, default=dict)  # Store arbitrary metadata (user_agent, source, etc.)
 
     # Relationships
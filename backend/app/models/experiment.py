@@ -1,10 +1,9 @@
 """Experiment model."""
-from sqlalchemy import Column, String, Text, Boolean, DateTime
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from datetime import datetime, timezone
 import uuid
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class Experiment(Base):
@@ -17,7 +16,14 @@ class Experiment(Base):
     description = Column(Text)
     variants = Column(JSONB, nullable=False)  # {"control": 50, "variant_a": 30, "variant_b": 20}
     active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+
+    __table_args__ = (
+        # Default experiment lookup (oldest active first) becomes a one-row
+        # index scan. Queries must filter `active = true`: `active IS TRUE`
+        # does not match the partial index predicate.
+        Index("ix_experiments_active_created_at", created_at, postgresql_where=active),
+    )
 
     def __repr__(self):
         return f"<Experiment {self.key} active={self.active}>"
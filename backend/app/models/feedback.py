@@ -2,10 +2,9 @@
 from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 import uuid
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class Feedback(Base):
@@ -17,7 +16,7 @@ class Feedback(Base):
     message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, unique=True)
     rating = Column(Integer, nullable=False)  # 1 (thumbs up) or -1 (thumbs down)
     comment = Column(Text)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
     # Relationships
     message = relationship("Message", back_populates="feedback")
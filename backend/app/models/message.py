@@ -1,12 +1,11 @@
 """Message model."""
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Enum as SQLEnum, Numeric
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, Numeric
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 import uuid
 import enum
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class MessageRole(str, enum.Enum):
@@ -37,11 +36,16 @@ class Message(Base):
     cost = Column(Numeric(10, 6))  # USD
     latency_ms = Column(Integer)
 
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     feedback = relationship("Feedback", back_populates="message", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Conversation history: latest N messages of one conversation
+        Index("ix_messages_conversation_id_created_at", conversation_id, created_at.desc()),
+    )
+
     def __repr__(self):
         return f"<Message {self.id} role={self.role.value}>"
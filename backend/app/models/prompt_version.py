@@ -1,10 +1,9 @@
 """Prompt version model for versioned system prompts."""
 from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime, timezone
 import uuid
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class PromptVersion(Base):
@@ -20,7 +19,7 @@ class PromptVersion(Base):
     version = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
     def __repr__(self):
         return f"<PromptVersion {self.variant} v{self.version} active={self.is_active}>"
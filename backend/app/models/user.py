@@ -2,10 +2,9 @@
 from sqlalchemy import Column, String, Integer, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 import uuid
 
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class User(Base):
@@ -16,7 +15,7 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     api_key_hash = Column(String(255), unique=True, nullable=False, index=True)
     rate_limit = Column(Integer, default=100)  # requests per hour
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
     # Relationships
     conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
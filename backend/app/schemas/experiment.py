@@ -1,5 +1,5 @@
 """Experiment request/response schemas."""
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Dict
 from uuid import UUID
 from datetime import datetime
@@ -54,5 +54,4 @@ class ExperimentResponse(BaseModel):
     active: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,85 @@
+"""Process-local TTL caches with cross-worker invalidation.
+
+Each worker keeps its own in-memory cache. Explicit invalidations evict the
+key locally and are published on a Redis pub/sub channel so every other
+worker evicts it too. Without Redis, entries simply age out after their TTL.
+"""
+import asyncio
+from typing import Any, Dict, Optional
+
+import structlog
+from cachetools import TTLCache
+from redis.asyncio import Redis
+
+logger = structlog.get_logger()
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Registry of named caches so invalidation messages can be routed
+_caches: Dict[str, "LocalCache"] = {}
+_redis_client: Optional[Redis] = None
+
+
+class LocalCache:
+    """Named, bounded TTL cache shared by all requests in this worker."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _caches[name] = self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired."""
+        return self._cache.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache a value until its TTL expires."""
+        self._cache[key] = value
+
+    def discard(self, key: str) -> None:
+        """Evict a key from this worker only."""
+        self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        """Evict every key from this worker only."""
+        self._cache.clear()
+
+    async def invalidate(self, key: str) -> None:
+        """Evict a key in this worker and broadcast the eviction to the others."""
+        self.discard(key)
+        if _redis_client is None:
+            return
+
+        try:
+            await _redis_client.publish(INVALIDATION_CHANNEL, f"{self.name}:{key}")
+        except Exception as e:
+            logger.warning("cache_invalidation_publish_failed", cache=self.name, error=str(e))
+
+
+async def listen_for_invalidations(redis_client: Redis) -> None:
+    """
+    Apply invalidations published by other workers until cancelled.
+
+    Run as a background task for the lifetime of the app. Reconnects after
+    Redis errors; entries missed while disconnected expire via their TTL.
+    """
+    global _redis_client
+    _redis_client = redis_client
+
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                name, _, key = message["data"].partition(":")
+                cache = _caches.get(name)
+                if cache is not None:
+                    cache.discard(key)
+        except asyncio.CancelledError:
+            _redis_client = None
+            raise
+        except Exception as e:
+            logger.warning("cache_invalidation_listener_error", error=str(e))
+            await asyncio.sleep(5)
+        finally:
+            await pubsub.aclose()
@@ -1,18 +1,97 @@
 """Experimentation service for A/B testing."""
+import asyncio
 import hashlib
-from typing import Dict, Optional
-from sqlalchemy.orm import Session
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
 
+from app.database import AsyncSessionLocal
 from app.models.experiment import Experiment
+from app.services.cache import LocalCache
+
+logger = structlog.get_logger()
+
+# Looked up on every chat request; built once at import
+_ACTIVE_EXPERIMENT_STMT = select(Experiment).where(
+    Experiment.key == bindparam("key"),
+    Experiment.active == True
+)
+_DEFAULT_EXPERIMENT_STMT = (
+    select(Experiment)
+    .where(Experiment.active == True)
+    .order_by(Experiment.created_at.asc())
+    .limit(1)
+)
+# Cache loads read just the columns the cached views need, skipping ORM
+# entity construction and identity-map bookkeeping
+_ACTIVE_VARIANTS_STMT = select(Experiment.variants).where(
+    Experiment.key == bindparam("key"),
+    Experiment.active == True
+)
+_DEFAULT_EXPERIMENT_KEY_STMT = _DEFAULT_EXPERIMENT_STMT.with_only_columns(Experiment.key)
+
+
+class ExperimentConfig(NamedTuple):
+    """Cached, session-independent view of an active experiment."""
+
+    key: str
+    # Sorted by variant name: PostgreSQL JSONB does NOT preserve insertion
+    # order, so sorting guarantees deterministic assignment everywhere
+    variants: Tuple[Tuple[str, int], ...]
+    # Variant names in the same order, and the running total of their
+    # weights: variant i covers buckets [cumulative[i-1], cumulative[i])
+    names: Tuple[str, ...]
+    cumulative: Tuple[int, ...]
+    # key.encode('utf-8'), so each assignment only encodes the user id
+    key_bytes: bytes
+
+    def variant_for(self, user_id: str) -> str:
+        """Map a user to one of this experiment's variants."""
+        # Create deterministic hash from user_id + experiment_key. The first
+        # 4 raw digest bytes are the same number as the first 8 hex chars, so
+        # buckets (and existing assignments) are unchanged without hexdigest
+        hash_input = user_id.encode('utf-8') + self.key_bytes
+        hash_digest = hashlib.sha256(hash_input).digest()
+        hash_value = int.from_bytes(hash_digest[:4], "big") % 100  # 0-99
+
+        # Distribute users based on variant weights (pre-sorted by key)
+        # Example: names ("control", "variant_a", "variant_b") with
+        # cumulative (50, 80, 100) puts bucket 65 in "variant_a"
+        index = bisect_right(self.cumulative, hash_value)
+        if index < len(self.names):
+            return self.names[index]
+
+        # Fallback to control (should never reach here if weights sum to 100)
+        return "control"
+
+
+# Active experiment definitions, shared by all requests in this worker.
+# Keys: "active:<experiment key>" -> ExperimentConfig or None, and
+# "default" -> key of the oldest active experiment or None. Changes made
+# through the API are invalidated explicitly; others age out after 60s.
+experiment_cache = LocalCache("experiments", maxsize=64, ttl=60)
+_MISSING = object()
+
+# Half the cache TTL, so refreshed entries replace old ones before they expire
+EXPERIMENT_REFRESH_SECONDS = 30
+
+
+async def invalidate_experiment(key: str) -> None:
+    """Evict cached lookups affected by creating, updating or deleting an experiment."""
+    await experiment_cache.invalidate(f"active:{key}")
+    await experiment_cache.invalidate("default")
 
 
 class ExperimentService:
     """Service for managing A/B experiments."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def assign_variant(self, user_id: str, experiment_key: str) -> str:
+    async def assign_variant(self, user_id: str, experiment_key: str) -> str:
         """
         Deterministically assign a variant to a user for a given experiment.
 
@@ -27,58 +106,79 @@ class ExperimentService:
 
         Example:
             >>> service = ExperimentService(db)
-            >>> variant = service.assign_variant("user_123", "prompt_exp_jan2024")
+            >>> variant = await service.assign_variant("user_123", "prompt_exp_jan2024")
             >>> print(variant)  # "control" or "variant_a" deterministically
         """
-        # Get experiment config from database
-        experiment = self.db.query(Experiment).filter(
-            Experiment.key == experiment_key,
-            Experiment.active == True
-        ).first()
+        # Get experiment config (cached, falls back to the database)
+        experiment = await self.get_experiment_config(experiment_key)
 
         if not experiment:
             return "control"  # Default to control if experiment not found
 
-        # Create deterministic hash from user_id + experiment_key
-        hash_input = f"{user_id}{experiment_key}".encode('utf-8')
-        hash_digest = hashlib.sha256(hash_input).hexdigest()
-        hash_value = int(hash_digest[:8], 16) % 100  # Take first 8 chars, convert to 0-99
+        return experiment.variant_for(user_id)
 
-        # IMPORTANT: Sort variants by key to ensure consistent ordering
-        # PostgreSQL JSONB does NOT preserve insertion order, so we must sort
-        # to guarantee deterministic assignment across all environments
-        sorted_variants = sorted(experiment.variants.items(), key=lambda x: x[0])
+    async def assign_variants(self, user_ids: Iterable[str], experiment_key: str) -> Dict[str, str]:
+        """
+        Assign variants to many users at once, e.g. for backfills or reports.
 
-        # Distribute users based on variant weights
-        # Example: [("control", 50), ("variant_a", 30), ("variant_b", 20)]
-        cumulative = 0
-        for variant, weight in sorted_variants:
-            cumulative += weight
-            if hash_value < cumulative:
-                return variant
+        Same assignments as assign_variant, but the experiment is looked up
+        once for the whole batch instead of once per user.
 
-        # Fallback to control (should never reach here if weights sum to 100)
-        return "control"
+        Args:
+            user_ids: Unique user identifiers
+            experiment_key: Experiment identifier
+
+        Returns:
+            Dict mapping each user_id to its variant name
+        """
+        experiment = await self.get_experiment_config(experiment_key)
+
+        if not experiment:
+            return dict.fromkeys(user_ids, "control")
+
+        variant_for = experiment.variant_for
+        return {user_id: variant_for(user_id) for user_id in user_ids}
+
+    async def get_experiment_config(self, key: str) -> Optional[ExperimentConfig]:
+        """Get an active experiment's config, from the cache when possible."""
+        config = experiment_cache.get(f"active:{key}", _MISSING)
+        if config is not _MISSING:
+            return config
+        return await self.load_experiment_config(key)
+
+    async def load_experiment_config(self, key: str) -> Optional[ExperimentConfig]:
+        """Read an active experiment's config from the database into the cache."""
+        variants = (await self.db.execute(_ACTIVE_VARIANTS_STMT, {"key": key})).scalar()
+        config = None
+        if variants is not None:
+            ordered = tuple(sorted(variants.items(), key=lambda x: x[0]))
+            config = ExperimentConfig(
+                key=key,
+                variants=ordered,
+                names=tuple(name for name, _ in ordered),
+                cumulative=tuple(accumulate(weight for _, weight in ordered)),
+                key_bytes=key.encode('utf-8')
+            )
+        # Misses are cached too, so an unknown configured key costs no queries
+        experiment_cache.set(f"active:{key}", config)
+        return config
 
-    def get_active_experiment(self, key: str) -> Optional[Experiment]:
+    async def get_active_experiment(self, key: str) -> Optional[Experiment]:
         """Get active experiment by key."""
-        return self.db.query(Experiment).filter(
-            Experiment.key == key,
-            Experiment.active == True
-        ).first()
+        result = await self.db.execute(_ACTIVE_EXPERIMENT_STMT, {"key": key})
+        return result.scalars().first()
 
-    def get_default_active_experiment(self) -> Optional[Experiment]:
+    async def get_default_active_experiment(self) -> Optional[Experiment]:
         """
         Get the default active experiment for chat.
 
         Returns the first active experiment ordered by creation date.
         Used when no specific experiment key is configured.
         """
-        return self.db.query(Experiment).filter(
-            Experiment.active == True
-        ).order_by(Experiment.created_at.asc()).first()
+        result = await self.db.execute(_DEFAULT_EXPERIMENT_STMT)
+        return result.scalars().first()
 
-    def get_experiment_key_for_chat(self, configured_key: str = "") -> Optional[str]:
+    async def get_experiment_key_for_chat(self, configured_key: str = "") -> Optional[str]:
         """
         Get the experiment key to use for chat.
 
@@ -90,16 +190,24 @@ class ExperimentService:
         """
         if configured_key:
             # Use configured key if the experiment exists and is active
-            experiment = self.get_active_experiment(configured_key)
+            experiment = await self.get_experiment_config(configured_key)
             if experiment:
                 return configured_key
             # Fall through to auto-select if configured experiment not found/active
 
         # Auto-select: get first active experiment
-        experiment = self.get_default_active_experiment()
-        return experiment.key if experiment else None
+        default_key = experiment_cache.get("default", _MISSING)
+        if default_key is _MISSING:
+            default_key = await self.load_default_experiment_key()
+        return default_key
 
-    def create_experiment(
+    async def load_default_experiment_key(self) -> Optional[str]:
+        """Read the default active experiment's key from the database into the cache."""
+        default_key = (await self.db.execute(_DEFAULT_EXPERIMENT_KEY_STMT)).scalar()
+        experiment_cache.set("default", default_key)
+        return default_key
+
+    async def create_experiment(
         self,
         key: str,
         description: str,
@@ -129,6 +237,47 @@ class ExperimentService:
             active=True
         )
         self.db.add(experiment)
-        self.db.commit()
-        self.db.refresh(experiment)
+        await self.db.commit()
+        await self.db.refresh(experiment)
+        await invalidate_experiment(key)
         return experiment
+
+
+async def refresh_chat_experiment(configured_key: str = "") -> Optional[str]:
+    """
+    Re-read the experiment used by chat into experiment_cache.
+
+    Overwrites entries instead of evicting them, so concurrent requests keep
+    hitting the cache while the refresh runs.
+
+    Returns:
+        The experiment key chat will use, or None if no active experiments.
+    """
+    async with AsyncSessionLocal() as db:
+        service = ExperimentService(db)
+        if configured_key and await service.load_experiment_config(configured_key):
+            return configured_key
+
+        default_key = await service.load_default_experiment_key()
+        if default_key:
+            await service.load_experiment_config(default_key)
+        return default_key
+
+
+async def refresh_experiments_periodically(
+    configured_key: str = "",
+    interval: float = EXPERIMENT_REFRESH_SECONDS
+) -> None:
+    """
+    Keep the chat experiment cached until cancelled.
+
+    Run as a background task for the lifetime of the app, so chat requests
+    resolve their experiment without database queries in steady state.
+    Changes made outside the API show up within one interval.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_chat_experiment(configured_key)
+        except Exception as e:
+            logger.warning("experiment_refresh_failed", error=str(e))
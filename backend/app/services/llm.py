@@ -1,4 +1,5 @@
 """LLM service for chat completions with streaming."""
+import httpx
 import openai
 from typing import AsyncGenerator, List, Dict, Tuple, Optional
 import time
@@ -6,6 +7,27 @@ import time
 from .token_counter import TokenCounterClient
 
 
+# USD per 1K tokens as (input, output). Kept per-1K with the same arithmetic
+# as before, so stored costs don't shift on half-micro-dollar roundings.
+_PRICING = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4-turbo-preview": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+# Unknown models are billed at gpt-3.5-turbo prices
+_DEFAULT_PRICE = _PRICING["gpt-3.5-turbo"]
+
+
+def _count_words(messages: List[Dict[str, str]]) -> int:
+    """Rough token estimate: whitespace-separated words across all messages."""
+    # One split over the joined text is the same count as splitting each
+    # message, without a Python-level loop over the per-message lists
+    return len(" ".join([msg.get("content", "") for msg in messages]).split())
+
+
 class LLMStreamError(Exception):
     """Raised when LLM streaming encounters an error."""
     pass
@@ -15,9 +37,21 @@ class LLMService:
     """Service for interacting with LLM APIs (OpenAI)."""
 
     def __init__(self, api_key: str, token_counter: Optional[TokenCounterClient] = None):
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        # HTTP/2 lets concurrent streams share pooled connections to the API
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(
+                timeout=openai.DEFAULT_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=100),
+                http2=True,
+            ),
+        )
         self.token_counter = token_counter
 
+    async def close(self):
+        """Close the underlying HTTP client."""
+        await self.client.close()
+
     async def pre_estimate_tokens(self, messages: List[Dict[str, str]], model: str) -> int:
         """
         Pre-estimate input tokens before making an LLM call.
@@ -34,7 +68,7 @@ class LLMService:
         """
         if self.token_counter is None:
             # Fallback: rough word-based estimation
-            return sum(len(msg.get("content", "").split()) for msg in messages)
+            return _count_words(messages)
 
         # Combine all message content for estimation
         combined_text = " ".join(
@@ -67,11 +101,11 @@ class LLMService:
             >>> async for token, metadata in service.stream_chat(messages):
             >>>     print(token, end="", flush=True)
         """
-        start_time = time.time()
-        full_content = ""
+        start_ns = time.perf_counter_ns()
+        full_parts: List[str] = []  # joined once at the end; += would copy per token
 
         # Rough token estimation (tokens_in)
-        tokens_in = sum(len(msg.get("content", "").split()) for msg in messages)
+        tokens_in = _count_words(messages)
         tokens_out = 0
 
         try:
@@ -82,27 +116,33 @@ class LLMService:
                 stream=True
             )
 
-            async for chunk in stream:
-                # Handle content tokens
-                if chunk.choices and chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    full_content += token
-                    tokens_out += 1  # Rough estimate
-                    yield token, {}
-
-                # Handle usage metadata (sent in final chunk)
-                if hasattr(chunk, 'usage') and chunk.usage:
-                    tokens_in = chunk.usage.prompt_tokens
-                    tokens_out = chunk.usage.completion_tokens
+            # Closing this generator early (client gone) closes the HTTP
+            # response, which stops generation upstream
+            async with stream:
+                async for chunk in stream:
+                    # Handle content tokens (attributes read once per chunk)
+                    choices = chunk.choices
+                    if choices:
+                        token = choices[0].delta.content
+                        if token:
+                            full_parts.append(token)
+                            tokens_out += 1  # Rough estimate
+                            yield token, {}
+
+                    # Handle usage metadata (sent in final chunk)
+                    usage = getattr(chunk, 'usage', None)
+                    if usage:
+                        tokens_in = usage.prompt_tokens
+                        tokens_out = usage.completion_tokens
 
             # Calculate latency and cost
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             cost = self._calculate_cost(model, tokens_in, tokens_out)
 
             # Yield final metadata
             yield "", {
                 "done": True,
-                "full_content": full_content,
+                "full_content": "".join(full_parts),
                 "tokens_in": tokens_in,
                 "tokens_out": tokens_out,
                 "latency_ms": latency_ms,
@@ -116,22 +156,8 @@ class LLMService:
 
     def _calculate_cost(self, model: str, tokens_in: int, tokens_out: int) -> float:
         """Calculate cost in USD for an API call."""
-        pricing = {
-            "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
-            "gpt-4": {"input": 0.03, "output": 0.06},
-            "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-            "gpt-4-turbo-preview": {"input": 0.01, "output": 0.03},
-            "gpt-4o": {"input": 0.005, "output": 0.015},
-            "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
-        }
-
-        # Default to gpt-3.5-turbo pricing if model not found
-        model_pricing = pricing.get(model, pricing["gpt-3.5-turbo"])
-
-        cost_in = (tokens_in / 1000) * model_pricing["input"]
-        cost_out = (tokens_out / 1000) * model_pricing["output"]
-
-        return round(cost_in + cost_out, 6)
+        price_in, price_out = _PRICING.get(model, _DEFAULT_PRICE)
+        return round((tokens_in / 1000) * price_in + (tokens_out / 1000) * price_out, 6)
 
     async def get_completion(
         self,
@@ -144,14 +170,14 @@ class LLMService:
         Returns:
             Dict with 'content', 'tokens_in', 'tokens_out', 'cost', 'latency_ms'
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         response = await self.client.chat.completions.create(
             model=model,
             messages=messages
         )
 
-        latency_ms = int((time.time() - start_time) * 1000)
+        latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
         tokens_in = response.usage.prompt_tokens
         tokens_out = response.usage.completion_tokens
         cost = self._calculate_cost(model, tokens_in, tokens_out)
@@ -1,16 +1,26 @@
 """Rate limiting service using Redis."""
-import redis
-from datetime import datetime, timezone
+from redis.asyncio import Redis
+import time
 from typing import Tuple
 
+# KEYS: [window_key]
+# ARGV: [window]
+# Returns: request count in the window, including this one
+INCR_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1], 'NX')
+return count
+"""
+
 
 class RateLimiter:
     """Redis-based fixed window rate limiter."""
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: Redis):
         self.redis = redis_client
+        self._incr_script = redis_client.register_script(INCR_SCRIPT)
 
-    def check_rate_limit(
+    async def check_rate_limit(
         self,
         key: str,
         limit: int = 100,
@@ -22,6 +32,8 @@ class RateLimiter:
         Uses fixed window algorithm with atomic INCR-first to avoid TOCTOU races:
         - Increment first, then check the returned value
         - If over limit, the count is slightly inflated but never under-counted
+        - Each window is a single integer key; its TTL is set once (EXPIRE NX)
+          when the window opens rather than rewritten on every request
 
         Args:
             key: Unique identifier (e.g., API key or user ID)
@@ -33,46 +45,36 @@ class RateLimiter:
 
         Example:
             >>> limiter = RateLimiter(redis_client)
-            >>> allowed, count = limiter.check_rate_limit("user_123", limit=100, window=3600)
+            >>> allowed, count = await limiter.check_rate_limit("user_123", limit=100, window=3600)
             >>> if not allowed:
             >>>     raise HTTPException(429, "Rate limit exceeded")
         """
         window_key = self._get_window_key(key, window)
 
-        # Atomic increment-first: avoids TOCTOU race between GET and INCR
-        pipe = self.redis.pipeline()
-        pipe.incr(window_key)
-        pipe.expire(window_key, window)
-        results = pipe.execute()
-
-        current_count = results[0]
+        # Atomic increment-first: avoids TOCTOU race between GET and INCR.
+        # The script runs both commands in one round trip, and atomically,
+        # so a window key can never be left without its TTL.
+        current_count = await self._incr_script(keys=[window_key], args=[window])
         return current_count <= limit, current_count
 
     def _get_window_key(self, key: str, window: int) -> str:
         """Generate Redis key for current time window."""
-        now = datetime.now(timezone.utc)
-
-        if window == 3600:  # 1 hour
-            window_id = now.strftime('%Y%m%d%H')
-        elif window == 60:  # 1 minute
-            window_id = now.strftime('%Y%m%d%H%M')
-        elif window == 86400:  # 1 day
-            window_id = now.strftime('%Y%m%d')
-        else:
-            # For custom windows, use timestamp divided by window
-            window_id = str(int(now.timestamp()) // window)
-
+        # Windows are aligned to the Unix epoch, so hourly and daily windows
+        # still roll over on UTC hour and day boundaries
+        window_id = int(time.time()) // window
         return f"rate_limit:{key}:{window_id}"
 
-    def reset(self, key: str):
+    async def reset(self, key: str):
         """Reset rate limit for a key (useful for testing)."""
         pattern = f"rate_limit:{key}:*"
-        for redis_key in self.redis.scan_iter(match=pattern):
-            self.redis.delete(redis_key)
+        window_keys = [redis_key async for redis_key in self.redis.scan_iter(match=pattern)]
+        if window_keys:
+            # One UNLINK for all windows; values are freed off the main thread
+            await self.redis.unlink(*window_keys)
 
-    def get_remaining(self, key: str, limit: int = 100, window: int = 3600) -> int:
+    async def get_remaining(self, key: str, limit: int = 100, window: int = 3600) -> int:
         """Get remaining requests in current window."""
         window_key = self._get_window_key(key, window)
-        current = self.redis.get(window_key)
+        current = await self.redis.get(window_key)
         used = int(current) if current else 0
         return max(0, limit - used)
@@ -3,31 +3,46 @@
 Limits concurrent SSE streams per user to prevent resource exhaustion.
 Uses Redis for distributed tracking across multiple workers.
 """
-import redis
+from redis.asyncio import Redis
 from typing import Optional
-from contextlib import contextmanager
-import uuid
+from contextlib import asynccontextmanager
+import secrets
+
+# Atomic check-and-add to avoid a TOCTOU race between SCARD and SADD
+# KEYS: [streams_key]
+# ARGV: [max_streams, stream_id, stream_ttl]
+# Returns 1 if the stream was registered, 0 if the user is at the limit
+ACQUIRE_SCRIPT = """
+local current = redis.call('SCARD', KEYS[1])
+if current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SADD', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
 
 
 class StreamLimiter:
     """Redis-based concurrent stream limiter."""
 
-    def __init__(self, redis_client: redis.Redis, default_limit: int = 5):
+    def __init__(self, redis_client: Redis, default_limit: int = 5):
         self.redis = redis_client
         self.default_limit = default_limit
         # Stream keys expire after 5 minutes (safety net for cleanup failures)
         self.stream_ttl = 300
+        self._acquire_script = redis_client.register_script(ACQUIRE_SCRIPT)
 
     def _get_streams_key(self, user_id: str) -> str:
         """Get Redis key for user's active streams set."""
         return f"streams:active:{user_id}"
 
-    def get_active_stream_count(self, user_id: str) -> int:
+    async def get_active_stream_count(self, user_id: str) -> int:
         """Get count of active streams for a user."""
         key = self._get_streams_key(user_id)
-        return self.redis.scard(key) or 0
+        return await self.redis.scard(key) or 0
 
-    def try_acquire_stream(self, user_id: str, limit: Optional[int] = None) -> Optional[str]:
+    async def try_acquire_stream(self, user_id: str, limit: Optional[int] = None) -> Optional[str]:
         """
         Atomically check limit and register a stream using a Lua script.
 
@@ -36,36 +51,28 @@ class StreamLimiter:
         """
         max_streams = limit or self.default_limit
         key = self._get_streams_key(user_id)
-        stream_id = str(uuid.uuid4())
-
-        # Lua script: atomic check-and-add to avoid TOCTOU race
-        lua_script = """
-        local current = redis.call('SCARD', KEYS[1])
-        if current >= tonumber(ARGV[1]) then
-            return 0
-        end
-        redis.call('SADD', KEYS[1], ARGV[2])
-        redis.call('EXPIRE', KEYS[1], ARGV[3])
-        return 1
-        """
-        acquired = self.redis.eval(lua_script, 1, key, max_streams, stream_id, self.stream_ttl)
+        stream_id = secrets.token_hex(16)
+
+        acquired = await self._acquire_script(
+            keys=[key], args=[max_streams, stream_id, self.stream_ttl]
+        )
 
         if acquired == 1:
             return stream_id
         return None
 
-    def unregister_stream(self, user_id: str, stream_id: str) -> None:
+    async def unregister_stream(self, user_id: str, stream_id: str) -> None:
         """Remove a stream from the active set."""
         key = self._get_streams_key(user_id)
-        self.redis.srem(key, stream_id)
+        await self.redis.srem(key, stream_id)
 
-    @contextmanager
-    def stream_context(self, user_id: str, limit: Optional[int] = None):
+    @asynccontextmanager
+    async def stream_context(self, user_id: str, limit: Optional[int] = None):
         """
-        Context manager for stream lifecycle.
+        Async context manager for stream lifecycle.
 
         Usage:
-            with stream_limiter.stream_context(user_id) as stream_id:
+            async with stream_limiter.stream_context(user_id) as stream_id:
                 # Stream is registered
                 async for token in stream_response():
                     yield token
@@ -74,7 +81,7 @@ class StreamLimiter:
         Raises:
             StreamLimitExceeded: If user has too many concurrent streams
         """
-        stream_id = self.try_acquire_stream(user_id, limit)
+        stream_id = await self.try_acquire_stream(user_id, limit)
 
         if stream_id is None:
             max_streams = limit or self.default_limit
@@ -85,7 +92,7 @@ class StreamLimiter:
         try:
             yield stream_id
         finally:
-            self.unregister_stream(user_id, stream_id)
+            await self.unregister_stream(user_id, stream_id)
 
 
 class StreamLimitExceeded(Exception):
@@ -0,0 +1,157 @@
+"""Helpers for Server-Sent Events streaming."""
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+
+# SSE comment line; clients ignore it, but it keeps proxies from idling out
+HEARTBEAT_FRAME = b": keepalive\n\n"
+
+_TIMED_OUT = object()
+# Queue markers for coalesce_tokens
+_FLUSH = object()
+_DONE = object()
+
+
+class _Reader:
+    """
+    Reads an async iterator with a timeout that never cancels the read.
+
+    Wrapping __anext__ in asyncio.wait_for would cancel the upstream on every
+    timeout (closing an LLM stream mid-response). Instead the pending read
+    runs as a task and carries over to the next call.
+    """
+
+    def __init__(self, iterable: AsyncIterator[Any]):
+        self._iterator = iterable.__aiter__()
+        self._pending: Optional[asyncio.Future] = None
+
+    async def read(self, timeout: Optional[float]) -> Any:
+        """
+        Return the next item, or _TIMED_OUT if none arrived within timeout.
+
+        Raises:
+            StopAsyncIteration: When the iterator is exhausted
+        """
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._iterator.__anext__())
+
+        done, _ = await asyncio.wait((self._pending,), timeout=timeout)
+        if not done:
+            return _TIMED_OUT
+
+        task, self._pending = self._pending, None
+        return task.result()
+
+    async def aclose(self) -> None:
+        """Cancel any pending read and close the underlying iterator."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.cancel()
+            await asyncio.wait((pending,))
+            if not pending.cancelled():
+                pending.exception()  # Mark retrieved; we are shutting down anyway
+
+        aclose = getattr(self._iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _pump(tokens: AsyncIterator[str], queue: asyncio.Queue) -> None:
+    """Move tokens from the upstream into queue as fast as they arrive."""
+    try:
+        async for token in tokens:
+            queue.put_nowait(token)
+    finally:
+        queue.put_nowait(_DONE)
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterator[str],
+    min_chars: int = 32,
+    max_delay: float = 0.03
+) -> AsyncIterator[str]:
+    """
+    Merge streamed LLM tokens into larger chunks.
+
+    A chunk is emitted once it holds at least min_chars characters, or
+    max_delay seconds after its first token arrived, so a slow upstream still
+    flushes promptly. A background task reads the upstream into a queue, so
+    network reads continue while a chunk is being written, and tokens that
+    queued up meanwhile are merged without further waits.
+
+    Example:
+        >>> async for chunk in coalesce_tokens(llm_tokens(), min_chars=32, max_delay=0.03):
+        >>>     yield f"data: {json.dumps({'token': chunk})}\\n\\n"
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    pump = asyncio.ensure_future(_pump(tokens, queue))
+    buffer: List[str] = []
+    size = 0
+    # Queues _FLUSH at the flush deadline; a timer handle instead of a
+    # timeout on every get(), which would need a task per token
+    flush_timer: Optional[asyncio.TimerHandle] = None
+
+    try:
+        while True:
+            token = await queue.get()
+
+            if token is _DONE:
+                await pump  # Re-raise an upstream error
+                break
+
+            if token is not _FLUSH:
+                buffer.append(token)
+                size += len(token)
+                if flush_timer is None:
+                    flush_timer = loop.call_at(loop.time() + max_delay, queue.put_nowait, _FLUSH)
+                if size < min_chars:
+                    continue
+            elif not buffer:
+                continue  # Timer fired just before a size-triggered flush
+
+            # Size threshold reached or flush deadline passed
+            if flush_timer is not None:
+                flush_timer.cancel()
+                flush_timer = None
+            chunk = "".join(buffer)
+            buffer.clear()
+            size = 0
+            yield chunk
+
+        if buffer:
+            yield "".join(buffer)
+
+    finally:
+        if flush_timer is not None:
+            flush_timer.cancel()
+        if not pump.done():
+            # Cancelling the pump closes the upstream at its pending read
+            pump.cancel()
+            await asyncio.wait((pump,))
+        if not pump.cancelled():
+            pump.exception()  # Mark retrieved; raised above if it mattered
+
+        aclose = getattr(tokens, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def with_heartbeat(
+    frames: AsyncIterator[bytes],
+    interval: float = 15.0,
+    heartbeat: bytes = HEARTBEAT_FRAME
+) -> AsyncIterator[bytes]:
+    """
+    Pass frames through, inserting a heartbeat whenever the upstream has
+    been silent for interval seconds (e.g. while the LLM is still thinking).
+    """
+    reader = _Reader(frames)
+    try:
+        while True:
+            try:
+                frame = await reader.read(interval)
+            except StopAsyncIteration:
+                return
+            yield heartbeat if frame is _TIMED_OUT else frame
+    finally:
+        await reader.aclose()
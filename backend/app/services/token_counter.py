@@ -4,14 +4,85 @@ Token Counter Client - Integration with Rust token counting service.
 This module provides a client for the Rust token counter microservice,
 with fallback to local estimation if the service is unavailable.
 """
+import asyncio
+import hashlib
+import time
 import httpx
+import orjson
 import structlog
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, List, Tuple
 from functools import lru_cache
 
+from app.services.cache import LocalCache
+
 logger = structlog.get_logger()
 
 
+# One request per chat turn; keep connections warm so each call skips the
+# TCP/TLS handshake. HTTP/2 multiplexes concurrent calls over HTTPS, so a
+# few idle connections suffice. Idle ones are kept 30s (httpx default: 5s)
+# so gaps between chats don't force a new handshake.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+
+# Bodies are encoded with orjson rather than httpx's stdlib json path;
+# input_text can be a whole conversation.
+_JSON_HEADERS = {"content-type": "application/json"}
+
+# USD per token (Rust service per-1K prices / 1000) as (input, output)
+_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005 / 1000, 0.0015 / 1000),
+    "gpt-3.5-turbo-0125": (0.0005 / 1000, 0.0015 / 1000),
+    "gpt-4": (0.03 / 1000, 0.06 / 1000),
+    "gpt-4-turbo": (0.01 / 1000, 0.03 / 1000),
+    "gpt-4-turbo-preview": (0.01 / 1000, 0.03 / 1000),
+    "gpt-4o": (0.005 / 1000, 0.015 / 1000),
+    "gpt-4o-mini": (0.00015 / 1000, 0.0006 / 1000),
+}
+_DEFAULT_PRICE = _PRICING["gpt-3.5-turbo"]
+
+# Replies from the Rust service, keyed by a hash of the request body. Eval
+# runs and A/B variants send the same (model, text) pairs over and over.
+RESPONSE_CACHE_MAXSIZE = 8192
+RESPONSE_CACHE_TTL_SECONDS = 1800
+
+# After this many consecutive failed calls, skip the service and estimate
+# locally for a backoff: 1s on the first trip, doubling with each failed
+# retry after that, up to the max. Otherwise every request during an outage
+# waits out the full timeout.
+FAILURE_THRESHOLD = 5
+MAX_BACKOFF_SECONDS = 30
+
+# Repeated inputs (system prompts, templates, retries) are answered from a
+# cache. Longer texts are rarely repeated and would pin a lot of memory.
+LOCAL_ESTIMATE_CACHE_MAX_CHARS = 4096
+
+
+def _estimate_tokens(text: str) -> int:
+    """~4 characters per token, nudged up for whitespace-dense text."""
+    if not text:
+        return 0
+
+    char_count = len(text)
+    base_estimate = (char_count + 3) // 4  # ceil(char_count / 4)
+
+    # str.split() drops exactly the str.isspace() characters, so this
+    # counts them in C instead of a per-character Python loop
+    whitespace_count = char_count - len("".join(text.split()))
+    whitespace_factor = 1.0 + (whitespace_count / char_count) * 0.1
+
+    return int(base_estimate * whitespace_factor + 0.5)
+
+
+_estimate_tokens_cached = lru_cache(maxsize=4096)(_estimate_tokens)
+
+
+@lru_cache(maxsize=1024)
+def _cost_cached(model: str, tokens_in: int, tokens_out: int) -> float:
+    price_in, price_out = _PRICING.get(model, _DEFAULT_PRICE)
+    # Rounded like the Rust service so both sources report the same cost
+    return round(tokens_in * price_in + tokens_out * price_out, 8)
+
+
 class TokenCounterClient:
     """
     Client for the Rust token counter service.
@@ -33,6 +104,17 @@ class TokenCounterClient:
         self.timeout = timeout
         self.enabled = enabled
         self._client: Optional[httpx.AsyncClient] = None
+        self._token_cache = LocalCache(
+            "token_counter_tokens", maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL_SECONDS
+        )
+        self._cost_cache = LocalCache(
+            "token_counter_cost", maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL_SECONDS
+        )
+        # In-flight requests by cache key, so concurrent misses share one call
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Circuit breaker state: consecutive failures and when to retry
+        self._failures = 0
+        self._degraded_until = 0.0
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create the HTTP client."""
@@ -40,6 +122,8 @@ class TokenCounterClient:
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
                 timeout=self.timeout,
+                limits=HTTP_LIMITS,
+                http2=True,
             )
         return self._client
 
@@ -49,22 +133,79 @@ class TokenCounterClient:
             await self._client.aclose()
             self._client = None
 
+    async def __aenter__(self) -> "TokenCounterClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # The pool is recreated on the next request if the client is reused
+        await self.close()
+
+    async def _post_cached(self, cache: LocalCache, path: str, body: bytes) -> Any:
+        """
+        POST body to path, answering repeats from cache.
+
+        Errors propagate (and are not cached) so callers can fall back.
+        """
+        key = hashlib.blake2b(body, digest_size=16).hexdigest()
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._post(path, body))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        # Shielded so one cancelled caller doesn't fail the others
+        data = await asyncio.shield(pending)
+        cache.set(key, data)
+        return data
+
+    async def _post(self, path: str, body: bytes) -> Any:
+        """POST a JSON body and return the decoded reply."""
+        try:
+            client = await self._get_client()
+            response = await client.post(path, content=body, headers=_JSON_HEADERS)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+        except Exception:
+            self._record_failure()
+            raise
+
+        self._record_success()
+        return data
+
+    def _use_service(self) -> bool:
+        """Whether to call the Rust service rather than estimate locally."""
+        return self.enabled and time.monotonic() >= self._degraded_until
+
+    def _record_success(self) -> None:
+        """Close the circuit breaker after a successful call."""
+        self._failures = 0
+        self._degraded_until = 0.0
+
+    def _record_failure(self) -> None:
+        """Count a failed call, backing off once the threshold is reached."""
+        self._failures += 1
+        if self._failures >= FAILURE_THRESHOLD:
+            backoff = min(MAX_BACKOFF_SECONDS, 2 ** (self._failures - FAILURE_THRESHOLD))
+            self._degraded_until = time.monotonic() + backoff
+            logger.warning(
+                "token_counter_degraded",
+                failures=self._failures,
+                backoff_seconds=backoff
+            )
+
     def _local_estimate_tokens(self, text: str) -> int:
         """
         Local fallback token estimation.
 
         Uses the same algorithm as the Rust service for consistency.
         """
-        if not text:
-            return 0
-
-        char_count = len(text)
-        base_estimate = (char_count + 3) // 4  # ceil(char_count / 4)
-
-        whitespace_count = sum(1 for c in text if c.isspace())
-        whitespace_factor = 1.0 + (whitespace_count / char_count) * 0.1
-
-        return int(base_estimate * whitespace_factor + 0.5)
+        if len(text) > LOCAL_ESTIMATE_CACHE_MAX_CHARS:
+            return _estimate_tokens(text)
+        return _estimate_tokens_cached(text)
 
     def _local_calculate_cost(self, model: str, tokens_in: int, tokens_out: int) -> float:
         """
@@ -72,21 +213,14 @@ class TokenCounterClient:
 
         Mirrors the Rust service pricing for consistency.
         """
-        pricing = {
-            "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
-            "gpt-3.5-turbo-0125": {"input": 0.0005, "output": 0.0015},
-            "gpt-4": {"input": 0.03, "output": 0.06},
-            "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-            "gpt-4-turbo-preview": {"input": 0.01, "output": 0.03},
-            "gpt-4o": {"input": 0.005, "output": 0.015},
-            "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
-        }
+        return _cost_cached(model, tokens_in, tokens_out)
 
-        model_pricing = pricing.get(model, pricing["gpt-3.5-turbo"])
-        cost_in = (tokens_in / 1000) * model_pricing["input"]
-        cost_out = (tokens_out / 1000) * model_pricing["output"]
-
-        return round(cost_in + cost_out, 8)
+    def cache_clear(self):
+        """Clear cached service replies and the shared local estimation caches."""
+        self._token_cache.clear()
+        self._cost_cache.clear()
+        _estimate_tokens_cached.cache_clear()
+        _cost_cached.cache_clear()
 
     async def estimate_tokens(self, text: str, model: str = "gpt-3.5-turbo") -> int:
         """
@@ -99,17 +233,13 @@ class TokenCounterClient:
         Returns:
             Estimated token count
         """
-        if not self.enabled:
+        if not self._use_service():
             return self._local_estimate_tokens(text)
 
         try:
-            client = await self._get_client()
-            response = await client.post(
-                "/tokens",
-                json={"text": text, "model": model}
+            data = await self._post_cached(
+                self._token_cache, "/tokens", orjson.dumps({"text": text, "model": model})
             )
-            response.raise_for_status()
-            data = response.json()
             return data["tokens"]
 
         except Exception as e:
@@ -120,6 +250,35 @@ class TokenCounterClient:
             )
             return self._local_estimate_tokens(text)
 
+    async def estimate_tokens_batch(self, texts: List[str], model: str = "gpt-3.5-turbo") -> List[int]:
+        """
+        Estimate token counts for several texts in one request.
+
+        Args:
+            texts: The texts to tokenize
+            model: Model name (for logging, not used in estimation)
+
+        Returns:
+            Estimated token counts, in the same order as texts
+        """
+        if not self._use_service():
+            return [self._local_estimate_tokens(text) for text in texts]
+        if not texts:
+            return []
+
+        try:
+            # Not cached: batches rarely repeat as a whole
+            data = await self._post("/tokens/batch", orjson.dumps({"texts": texts, "model": model}))
+            return data["tokens"]
+
+        except Exception as e:
+            logger.warning(
+                "token_counter_fallback",
+                error=str(e),
+                reason="rust_service_unavailable"
+            )
+            return [self._local_estimate_tokens(text) for text in texts]
+
     async def estimate_cost(
         self,
         model: str,
@@ -143,7 +302,7 @@ class TokenCounterClient:
         Returns:
             Dict with tokens_in, tokens_out, cost_usd, model
         """
-        if not self.enabled:
+        if not self._use_service():
             final_tokens_in = tokens_in if tokens_in is not None else self._local_estimate_tokens(input_text or "")
             final_tokens_out = tokens_out if tokens_out is not None else self._local_estimate_tokens(output_text or "")
             cost = self._local_calculate_cost(model, final_tokens_in, final_tokens_out)
@@ -152,11 +311,10 @@ class TokenCounterClient:
                 "tokens_out": final_tokens_out,
                 "cost_usd": cost,
                 "model": model,
-                "source": "local"
+                "source": "local" if not self.enabled else "local_fallback"
             }
 
         try:
-            client = await self._get_client()
             payload = {"model": model}
             if input_text is not None:
                 payload["input_text"] = input_text
@@ -167,11 +325,9 @@ class TokenCounterClient:
             if tokens_out is not None:
                 payload["tokens_out"] = tokens_out
 
-            response = await client.post("/cost", json=payload)
-            response.raise_for_status()
-            data = response.json()
-            data["source"] = "rust"
-            return data
+            data = await self._post_cached(self._cost_cache, "/cost", orjson.dumps(payload))
+            # Copy so callers can't mutate the cached reply
+            return {**data, "source": "rust"}
 
         except Exception as e:
             logger.warning(
@@ -190,6 +346,21 @@ class TokenCounterClient:
                 "source": "local_fallback"
             }
 
+    async def ping(self, timeout: float = 10.0) -> int:
+        """
+        Request /health on the shared connection pool and return the status code.
+
+        Unlike health_check, errors propagate so callers can log them. The
+        longer timeout allows for a service that is waking up. A 200 also
+        ends any backoff from earlier failures, so the keep-alive ping
+        restores the service without waiting for the next chat to probe it.
+        """
+        client = await self._get_client()
+        response = await client.get("/health", timeout=timeout)
+        if response.status_code == 200:
+            self._record_success()
+        return response.status_code
+
     async def health_check(self) -> bool:
         """Check if the Rust service is healthy."""
         if not self.enabled:
@@ -216,7 +387,10 @@ def get_token_counter(
     Get or create the global token counter client.
 
     This function provides a singleton pattern for the client,
-    ensuring connection reuse across requests.
+    ensuring connection reuse across requests. It is synchronous, so the
+    check and the assignment can't interleave with other coroutines; the
+    pool itself is created on the first request by _get_client, which
+    likewise never awaits before storing it.
     """
     global _token_counter_client
     if _token_counter_client is None:
@@ -0,0 +1,49 @@
+"""Shared database and Redis fixtures."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tables():
+    """Create the schema once for the whole test run."""
+    from app.database import engine, Base
+
+    # Runs against the Postgres DATABASE_URL that CI provides (the models use
+    # JSONB and pg_insert, and the async engine is asyncpg). create_all
+    # rather than Alembic, since no revision creates the tables
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+async def db(tables):
+    """Create test database session."""
+    from app.database import AsyncSessionLocal, async_engine, engine, Base
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+    # Pooled async connections are bound to this test's event loop
+    await async_engine.dispose()
+
+    # Empty the tables rather than rolling back: code under test commits and
+    # opens its own sessions (e.g. refresh_chat_experiment)
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def lua_script():
+    """Create a mock for a Lua script registered with register_script."""
+    return AsyncMock()
+
+
+@pytest.fixture
+def script_redis(lua_script):
+    """Create a mock Redis client whose registered scripts are lua_script."""
+    redis_mock = MagicMock()
+    redis_mock.register_script.return_value = lua_script
+    return redis_mock
@@ -0,0 +1,60 @@
+"""Tests for chat admission control."""
+import pytest
+from app.services.admission import ChatAdmission
+from app.services.rate_limiter import RateLimiter
+from app.services.stream_limiter import StreamLimiter
+
+
+@pytest.fixture
+def admission(script_redis, lua_script):
+    """Create a ChatAdmission backed by a mock Redis client."""
+    lua_script.return_value = [1, 1, 1, 1]
+    return ChatAdmission(
+        RateLimiter(script_redis),
+        StreamLimiter(script_redis, default_limit=5)
+    )
+
+
+async def test_admit_acquires_stream_when_allowed(admission, lua_script):
+    """Test that an allowed request gets a stream ID and remaining count."""
+    lua_script.return_value = [1, 1, 3, 2]
+
+    result = await admission.admit("user_123", rate_limit=10, window=3600)
+
+    assert result.allowed
+    assert result.stream_id is not None
+    assert result.count == 3
+    assert result.remaining == 7
+    assert result.active_streams == 2
+
+
+async def test_admit_uses_single_script_call(admission, lua_script):
+    """Test that rate limit and stream keys are checked in one script call."""
+    await admission.admit("user_123", rate_limit=10, window=3600)
+
+    lua_script.assert_awaited_once()
+    keys = lua_script.call_args.kwargs["keys"]
+    assert keys[0].startswith("rate_limit:user_123:")
+    assert keys[1] == "streams:active:user_123"
+
+
+async def test_admit_rejects_over_rate_limit(admission, lua_script):
+    """Test that exceeding the rate limit is reported without a stream."""
+    lua_script.return_value = [0, 0, 11, 0]
+
+    result = await admission.admit("user_123", rate_limit=10, window=3600)
+
+    assert not result.allowed
+    assert result.stream_id is None
+    assert result.remaining == 0
+
+
+async def test_admit_rejects_at_stream_limit(admission, lua_script):
+    """Test that a full stream set is reported with the current count."""
+    lua_script.return_value = [1, 0, 2, 5]
+
+    result = await admission.admit("user_123", rate_limit=10, window=3600)
+
+    assert result.allowed
+    assert result.stream_id is None
+    assert result.active_streams == 5
@@ -1,9 +1,20 @@
 """Tests for API key authentication."""
 import pytest
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
-from app.middleware.auth import hash_api_key, create_user_with_api_key
+from app.middleware.auth import (
+    authenticated_user_cache,
+    create_user_with_api_key,
+    get_current_user,
+    hash_api_key,
+)
+
+LOOKUP_KEY_HASH = hash_api_key("lookup-test-key")
+REAL_KEY_HASH = hash_api_key("real-key")
+WRONG_KEY_HASH = hash_api_key("wrong-key")
 
 
 def test_hash_api_key_is_deterministic():
@@ -37,65 +48,66 @@ def test_different_keys_produce_different_hashes():
     assert hash1 != hash2, "Different keys should produce different hashes"
 
 
-def test_create_user_with_api_key(db: Session):
+async def test_create_user_with_api_key(db: AsyncSession):
     """Test creating a user with an API key."""
     api_key = "new-test-key-abc123"
 
-    user = create_user_with_api_key(db, api_key, rate_limit=50)
+    user = await create_user_with_api_key(db, api_key, rate_limit=50)
 
     assert user.id is not None
     assert user.api_key_hash == hash_api_key(api_key)
     assert user.rate_limit == 50
 
 
-def test_user_lookup_by_hash(db: Session):
+async def test_user_lookup_by_hash(db: AsyncSession):
     """Test that users can be looked up directly by hash."""
-    api_key = "lookup-test-key"
-    expected_hash = hash_api_key(api_key)
-
     # Create user
-    user = User(api_key_hash=expected_hash, rate_limit=100)
+    user = User(api_key_hash=LOOKUP_KEY_HASH, rate_limit=100)
     db.add(user)
-    db.commit()
+    await db.commit()
 
     # Lookup by hash (this is how get_current_user works)
-    found_user = db.query(User).filter(
-        User.api_key_hash == expected_hash
-    ).first()
+    result = await db.execute(select(User).where(User.api_key_hash == LOOKUP_KEY_HASH))
+    found_user = result.scalars().first()
 
     assert found_user is not None
     assert found_user.id == user.id
 
 
-def test_invalid_hash_returns_none(db: Session):
+async def test_invalid_hash_returns_none(db: AsyncSession):
     """Test that invalid hash returns no user."""
     # Create a user with one key
-    user = User(api_key_hash=hash_api_key("real-key"), rate_limit=100)
+    user = User(api_key_hash=REAL_KEY_HASH, rate_limit=100)
     db.add(user)
-    db.commit()
+    await db.commit()
 
     # Try to find with wrong key
-    wrong_hash = hash_api_key("wrong-key")
-    found_user = db.query(User).filter(
-        User.api_key_hash == wrong_hash
-    ).first()
+    result = await db.execute(select(User).where(User.api_key_hash == WRONG_KEY_HASH))
+    found_user = result.scalars().first()
 
     assert found_user is None
 
 
-@pytest.fixture
-def db():
-    """Create test database session."""
-    from app.database import SessionLocal, engine, Base
+async def test_authenticated_user_is_cached_until_invalidated(db: AsyncSession):
+    """Test that repeat lookups skip the database until the key is invalidated."""
+    api_key = "cached-test-key"
+    user = await create_user_with_api_key(db, api_key)
+
+    current = await get_current_user(api_key, db)
+    assert current.id == user.id
 
-    # Tests use create_all (not Alembic) since they run against SQLite
-    Base.metadata.create_all(bind=engine)
+    # Served from the cache even though the row is gone
+    await db.execute(delete(User).where(User.id == user.id))
+    await db.commit()
+    assert (await get_current_user(api_key, db)).id == user.id
 
-    # Create session
-    session = SessionLocal()
+    await authenticated_user_cache.invalidate(hash_api_key(api_key))
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(api_key, db)
+    assert exc_info.value.status_code == 401
 
-    yield session
 
-    # Cleanup
-    session.close()
-    Base.metadata.drop_all(bind=engine)
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start each test with an empty authenticated_user_cache."""
+    authenticated_user_cache.clear()
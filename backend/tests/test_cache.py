@@ -0,0 +1,45 @@
+"""Tests for process-local caches."""
+from unittest.mock import AsyncMock, patch
+
+from app.services import cache
+from app.services.cache import LocalCache
+
+
+def test_set_and_get():
+    """Test that cached values are returned until discarded."""
+    local = LocalCache("test_set_get", maxsize=10, ttl=60)
+    local.set("key", "value")
+
+    assert local.get("key") == "value"
+
+    local.discard("key")
+    assert local.get("key") is None
+
+
+def test_entries_expire_after_ttl():
+    """Test that entries are not returned after their TTL."""
+    local = LocalCache("test_ttl", maxsize=10, ttl=0)
+    local.set("key", "value")
+
+    assert local.get("key", "missing") == "missing"
+
+
+async def test_invalidate_without_redis_evicts_locally():
+    """Test that invalidate works when no Redis client is bound."""
+    local = LocalCache("test_no_redis", maxsize=10, ttl=60)
+    local.set("key", "value")
+
+    await local.invalidate("key")
+
+    assert local.get("key") is None
+
+
+async def test_invalidate_publishes_to_other_workers():
+    """Test that invalidate broadcasts the cache name and key."""
+    local = LocalCache("test_publish", maxsize=10, ttl=60)
+    redis_mock = AsyncMock()
+
+    with patch.object(cache, "_redis_client", redis_mock):
+        await local.invalidate("abc:123")
+
+    redis_mock.publish.assert_awaited_once_with(cache.INVALIDATION_CHANNEL, "test_publish:abc:123")
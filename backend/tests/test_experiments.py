@@ -1,12 +1,20 @@
 """Tests for experimentation service."""
+import hashlib
+from collections import Counter
+
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.experiment import Experiment
-from app.services.experiments import ExperimentService
+from app.services.experiments import (
+    ExperimentService,
+    experiment_cache,
+    invalidate_experiment,
+    refresh_chat_experiment,
+)
 
 
-def test_deterministic_variant_assignment(db: Session):
+async def test_deterministic_variant_assignment(db: AsyncSession):
     """Test that variant assignment is deterministic."""
     # Create test experiment
     experiment = Experiment(
@@ -16,19 +24,19 @@ def test_deterministic_variant_assignment(db: Session):
         active=True
     )
     db.add(experiment)
-    db.commit()
+    await db.commit()
 
     service = ExperimentService(db)
 
     # Same user should always get same variant
-    variant1 = service.assign_variant("user_123", "test_exp")
-    variant2 = service.assign_variant("user_123", "test_exp")
-    variant3 = service.assign_variant("user_123", "test_exp")
+    variant1 = await service.assign_variant("user_123", "test_exp")
+    variant2 = await service.assign_variant("user_123", "test_exp")
+    variant3 = await service.assign_variant("user_123", "test_exp")
 
     assert variant1 == variant2 == variant3, "Variant assignment should be deterministic"
 
 
-def test_variant_distribution(db: Session):
+async def test_variant_distribution(db: AsyncSession):
     """Test that variants are distributed according to weights."""
     # Create experiment with known distribution
     experiment = Experiment(
@@ -38,22 +46,66 @@ def test_variant_distribution(db: Session):
         active=True
     )
     db.add(experiment)
-    db.commit()
+    await db.commit()
 
     service = ExperimentService(db)
 
-    # Assign variants to many users
-    assignments = {}
-    for i in range(1000):
-        variant = service.assign_variant(f"user_{i}", "test_dist")
-        assignments[variant] = assignments.get(variant, 0) + 1
+    # Assign variants to many users in one batch
+    assigned = await service.assign_variants([f"user_{i}" for i in range(1000)], "test_dist")
+    assignments = Counter(assigned.values())
 
     # Check that distribution is roughly 50/50 (allow 10% margin)
     control_pct = assignments.get("control", 0) / 1000 * 100
     assert 40 <= control_pct <= 60, f"Control should be ~50%, got {control_pct}%"
 
 
-def test_inactive_experiment_returns_control(db: Session):
+async def test_bulk_assignment_matches_single_assignment(db: AsyncSession):
+    """Test that assign_variants gives each user the same variant as assign_variant."""
+    experiment = Experiment(
+        key="test_bulk",
+        description="Test bulk assignment",
+        variants={"control": 50, "variant_a": 30, "variant_b": 20},
+        active=True
+    )
+    db.add(experiment)
+    await db.commit()
+
+    service = ExperimentService(db)
+    user_ids = [f"user_{i}" for i in range(200)]
+
+    assignments = await service.assign_variants(user_ids, "test_bulk")
+
+    assert assignments == {
+        user_id: await service.assign_variant(user_id, "test_bulk") for user_id in user_ids
+    }
+    assert await service.assign_variants(user_ids[:3], "nonexistent_exp") == dict.fromkeys(user_ids[:3], "control")
+
+
+async def test_buckets_match_hexdigest_formula(db: AsyncSession):
+    """Test that assignments match the original int(hexdigest[:8], 16) buckets.
+
+    Existing users must keep their variants across hashing optimizations.
+    """
+    experiment = Experiment(
+        key="test_legacy",
+        description="Test legacy buckets",
+        variants={"control": 50, "variant_a": 30, "variant_b": 20},
+        active=True
+    )
+    db.add(experiment)
+    await db.commit()
+
+    service = ExperimentService(db)
+
+    for i in range(200):
+        user_id = f"user_{i}"
+        digest = hashlib.sha256(f"{user_id}test_legacy".encode("utf-8")).hexdigest()
+        bucket = int(digest[:8], 16) % 100
+        expected = "control" if bucket < 50 else "variant_a" if bucket < 80 else "variant_b"
+        assert await service.assign_variant(user_id, "test_legacy") == expected
+
+
+async def test_inactive_experiment_returns_control(db: AsyncSession):
     """Test that inactive experiments return control variant."""
     # Create inactive experiment
     experiment = Experiment(
@@ -63,23 +115,23 @@ def test_inactive_experiment_returns_control(db: Session):
         active=False
     )
     db.add(experiment)
-    db.commit()
+    await db.commit()
 
     service = ExperimentService(db)
-    variant = service.assign_variant("user_123", "test_inactive")
+    variant = await service.assign_variant("user_123", "test_inactive")
 
     assert variant == "control", "Inactive experiment should return control"
 
 
-def test_nonexistent_experiment_returns_control(db: Session):
+async def test_nonexistent_experiment_returns_control(db: AsyncSession):
     """Test that nonexistent experiments return control variant."""
     service = ExperimentService(db)
-    variant = service.assign_variant("user_123", "nonexistent_exp")
+    variant = await service.assign_variant("user_123", "nonexistent_exp")
 
     assert variant == "control", "Nonexistent experiment should return control"
 
 
-def test_variant_ordering_is_stable(db: Session):
+async def test_variant_ordering_is_stable(db: AsyncSession):
     """Test that variant assignment is stable regardless of dict ordering.
 
     PostgreSQL JSONB does not preserve insertion order, so variants
@@ -94,20 +146,20 @@ def test_variant_ordering_is_stable(db: Session):
         active=True
     )
     db.add(experiment)
-    db.commit()
+    await db.commit()
 
     service = ExperimentService(db)
 
     # Test many users and record assignments
     assignments_run1 = {}
     for i in range(100):
-        variant = service.assign_variant(f"user_{i}", "test_order")
+        variant = await service.assign_variant(f"user_{i}", "test_order")
         assignments_run1[f"user_{i}"] = variant
 
     # Simulate what would happen if JSONB returned variants in different order
     # by creating a new experiment with same weights but different insertion order
-    db.delete(experiment)
-    db.commit()
+    await db.delete(experiment)
+    await db.commit()
 
     experiment2 = Experiment(
         key="test_order",
@@ -116,12 +168,13 @@ def test_variant_ordering_is_stable(db: Session):
         active=True
     )
     db.add(experiment2)
-    db.commit()
+    await db.commit()
+    experiment_cache.clear()  # Force the new row to be read back
 
     # Run again - should get identical assignments because we sort by key
     assignments_run2 = {}
     for i in range(100):
-        variant = service.assign_variant(f"user_{i}", "test_order")
+        variant = await service.assign_variant(f"user_{i}", "test_order")
         assignments_run2[f"user_{i}"] = variant
 
     # Verify assignments are identical
@@ -129,19 +182,76 @@ def test_variant_ordering_is_stable(db: Session):
         "Variant assignment must be stable regardless of dict ordering"
 
 
-@pytest.fixture
-def db():
-    """Create test database session."""
-    from app.database import SessionLocal, engine, Base
+async def test_experiment_changes_visible_after_invalidation(db: AsyncSession):
+    """Test that cached experiment configs are refreshed once invalidated."""
+    experiment = Experiment(
+        key="test_cache",
+        description="Test caching",
+        variants={"variant_a": 100},
+        active=True
+    )
+    db.add(experiment)
+    await db.commit()
+
+    service = ExperimentService(db)
+    assert await service.assign_variant("user_123", "test_cache") == "variant_a"
+
+    experiment.active = False
+    await db.commit()
+    # Still served from the cache until invalidated
+    assert await service.assign_variant("user_123", "test_cache") == "variant_a"
+
+    await invalidate_experiment("test_cache")
+    assert await service.assign_variant("user_123", "test_cache") == "control"
 
-    # Tests use create_all (not Alembic) since they run against SQLite
-    Base.metadata.create_all(bind=engine)
 
-    # Create session
-    session = SessionLocal()
+async def test_experiment_key_for_chat(db: AsyncSession):
+    """Test chat experiment selection: configured key first, else oldest active."""
+    service = ExperimentService(db)
+    assert await service.get_experiment_key_for_chat() is None
+
+    # The miss above is cached; evict it as the API does after a create
+    await invalidate_experiment("test_oldest")
+    db.add(Experiment(key="test_oldest", description="Oldest", variants={"control": 100}, active=True))
+    await db.commit()
+    db.add(Experiment(key="test_newer", description="Newer", variants={"control": 100}, active=True))
+    await db.commit()
+
+    assert await service.get_experiment_key_for_chat() == "test_oldest"
+    assert await service.get_experiment_key_for_chat("test_newer") == "test_newer"
+    assert await service.get_experiment_key_for_chat("nonexistent_exp") == "test_oldest"
+
+
+async def test_refresh_chat_experiment_falls_back_to_default(db: AsyncSession):
+    """Test that the background refresh re-resolves the chat experiment."""
+    configured = Experiment(
+        key="test_configured",
+        description="Configured experiment",
+        variants={"control": 100},
+        active=True
+    )
+    default = Experiment(
+        key="test_default",
+        description="Default experiment",
+        variants={"control": 100},
+        active=True
+    )
+    db.add(configured)
+    db.add(default)
+    await db.commit()
+
+    assert await refresh_chat_experiment("test_configured") == "test_configured"
+
+    configured.active = False
+    await db.commit()
+    assert await refresh_chat_experiment("test_configured") == "test_default"
+
+    # Chat reads the refreshed entries without querying
+    service = ExperimentService(db)
+    assert await service.get_experiment_key_for_chat("test_configured") == "test_default"
 
-    yield session
 
-    # Cleanup
-    session.close()
-    Base.metadata.drop_all(bind=engine)
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start each test with an empty experiment_cache."""
+    experiment_cache.clear()
@@ -0,0 +1,99 @@
+"""Tests for feedback submission."""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.feedback import submit_feedback
+from app.middleware.auth import AuthenticatedUser, create_user_with_api_key
+from app.models.conversation import Conversation
+from app.models.feedback import Feedback
+from app.models.message import Message, MessageRole
+from app.schemas.feedback import FeedbackRequest
+
+
+async def _user_with_message(db: AsyncSession, api_key: str):
+    """Create a user with one assistant message; return (AuthenticatedUser, message_id)."""
+    user = await create_user_with_api_key(db, api_key)
+    conversation = Conversation(user_id=user.id)
+    db.add(conversation)
+    await db.flush()
+    message = Message(
+        conversation_id=conversation.id,
+        role=MessageRole.ASSISTANT,
+        content="Hello!",
+        experiment_variant="concise"
+    )
+    db.add(message)
+    await db.commit()
+
+    authenticated = AuthenticatedUser(
+        id=user.id,
+        api_key_hash=user.api_key_hash,
+        rate_limit=user.rate_limit,
+        created_at=user.created_at
+    )
+    return authenticated, message.id
+
+
+async def _feedback_rows(db: AsyncSession):
+    """All feedback rows, read fresh from the database."""
+    db.expire_all()
+    return (await db.execute(select(Feedback))).scalars().all()
+
+
+async def test_first_feedback_is_recorded(db: AsyncSession):
+    """Test that the first submission inserts one feedback row."""
+    user, message_id = await _user_with_message(db, "feedback-key-1")
+
+    response = await submit_feedback(
+        FeedbackRequest(message_id=message_id, rating=1, comment="Great"), user, db
+    )
+
+    assert response.message == "Feedback recorded"
+    rows = await _feedback_rows(db)
+    assert len(rows) == 1
+    assert rows[0].message_id == message_id
+    assert rows[0].rating == 1
+    assert rows[0].comment == "Great"
+
+
+async def test_second_feedback_updates_existing_row(db: AsyncSession):
+    """Test that resubmitting updates rating and comment instead of duplicating."""
+    user, message_id = await _user_with_message(db, "feedback-key-2")
+    await submit_feedback(FeedbackRequest(message_id=message_id, rating=1), user, db)
+
+    response = await submit_feedback(
+        FeedbackRequest(message_id=message_id, rating=-1, comment="Changed my mind"), user, db
+    )
+
+    assert response.message == "Feedback updated"
+    rows = await _feedback_rows(db)
+    assert len(rows) == 1
+    assert rows[0].rating == -1
+    assert rows[0].comment == "Changed my mind"
+
+
+async def test_feedback_on_another_users_message_is_rejected(db: AsyncSession):
+    """Test that a message owned by someone else returns 404 and writes nothing."""
+    _, message_id = await _user_with_message(db, "feedback-owner-key")
+    intruder, _ = await _user_with_message(db, "feedback-intruder-key")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await submit_feedback(FeedbackRequest(message_id=message_id, rating=1), intruder, db)
+
+    assert exc_info.value.status_code == 404
+    assert (await db.scalar(select(func.count()).select_from(Feedback))) == 0
+
+
+async def test_feedback_on_missing_message_is_rejected(db: AsyncSession):
+    """Test that an unknown message returns 404 and writes nothing."""
+    user, _ = await _user_with_message(db, "feedback-key-3")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await submit_feedback(FeedbackRequest(message_id=uuid.uuid4(), rating=-1), user, db)
+
+    assert exc_info.value.status_code == 404
+    assert (await db.scalar(select(func.count()).select_from(Feedback))) == 0
@@ -0,0 +1,46 @@
+"""Tests for rate limiting service."""
+import pytest
+from unittest.mock import AsyncMock
+from app.services.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def limiter(script_redis, lua_script):
+    """Create a RateLimiter backed by a mock Redis client."""
+    lua_script.return_value = 1
+    return RateLimiter(script_redis)
+
+
+async def test_check_rate_limit_uses_single_script_call(limiter, lua_script):
+    """Test that counting a request costs one script call on the window key."""
+    allowed, count = await limiter.check_rate_limit("user_123", limit=10, window=3600)
+
+    assert allowed
+    assert count == 1
+    lua_script.assert_awaited_once()
+    assert lua_script.call_args.kwargs["keys"][0].startswith("rate_limit:user_123:")
+    assert lua_script.call_args.kwargs["args"] == [3600]
+
+
+async def test_check_rate_limit_rejects_over_limit(limiter, lua_script):
+    """Test that the request past the limit is rejected with its count."""
+    lua_script.return_value = 11
+
+    allowed, count = await limiter.check_rate_limit("user_123", limit=10, window=3600)
+
+    assert not allowed
+    assert count == 11
+
+
+async def test_reset_unlinks_all_windows_at_once(limiter):
+    """Test that reset removes every window for the key in one call."""
+    async def scan_iter(match):
+        for redis_key in ("rate_limit:user_123:1", "rate_limit:user_123:2"):
+            yield redis_key
+
+    limiter.redis.scan_iter = scan_iter
+    limiter.redis.unlink = AsyncMock()
+
+    await limiter.reset("user_123")
+
+    limiter.redis.unlink.assert_awaited_once_with("rate_limit:user_123:1", "rate_limit:user_123:2")
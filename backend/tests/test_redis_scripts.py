@@ -0,0 +1,93 @@
+"""Tests that run the Lua scripts against a real Redis server."""
+import os
+import uuid
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.services.admission import ChatAdmission
+from app.services.rate_limiter import RateLimiter
+from app.services.stream_limiter import StreamLimiter
+
+
+@pytest.fixture
+async def redis_client():
+    """Connect to the Redis at REDIS_URL, skipping the test without one."""
+    url = os.environ.get("REDIS_URL")
+    if not url:
+        pytest.skip("REDIS_URL not set")
+
+    client = aioredis.from_url(url, decode_responses=True)
+    try:
+        await client.ping()
+    except Exception as e:
+        await client.aclose()
+        pytest.skip(f"Redis unavailable: {e}")
+
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def user_id(redis_client):
+    """A user ID whose keys no other test touches."""
+    return f"test_{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+async def cleanup(redis_client, user_id):
+    """Delete the test user's keys afterwards."""
+    yield
+    keys = [key async for key in redis_client.scan_iter(match=f"*{user_id}*")]
+    if keys:
+        await redis_client.delete(*keys)
+
+
+async def test_incr_script_sets_ttl_only_when_window_opens(redis_client, user_id, cleanup):
+    """Test that INCR_SCRIPT counts requests and never extends the window's TTL."""
+    limiter = RateLimiter(redis_client)
+
+    assert await limiter.check_rate_limit(user_id, limit=2, window=3600) == (True, 1)
+    window_key = limiter._get_window_key(user_id, 3600)
+    assert 3590 < await redis_client.ttl(window_key) <= 3600
+
+    # EXPIRE NX leaves an existing TTL alone
+    await redis_client.expire(window_key, 100)
+    assert await limiter.check_rate_limit(user_id, limit=2, window=3600) == (True, 2)
+    assert await limiter.check_rate_limit(user_id, limit=2, window=3600) == (False, 3)
+    assert await redis_client.ttl(window_key) <= 100
+
+
+async def test_admit_script_claims_no_stream_when_rate_limited(redis_client, user_id, cleanup):
+    """Test that ADMIT_SCRIPT only claims a stream slot for allowed requests."""
+    stream_limiter = StreamLimiter(redis_client, default_limit=5)
+    admission = ChatAdmission(RateLimiter(redis_client), stream_limiter)
+
+    first = await admission.admit(user_id, rate_limit=1, window=3600)
+    assert first.allowed
+    assert first.stream_id is not None
+    assert await stream_limiter.get_active_stream_count(user_id) == 1
+
+    second = await admission.admit(user_id, rate_limit=1, window=3600)
+    assert not second.allowed
+    assert second.stream_id is None
+    assert second.count == 2
+    assert await stream_limiter.get_active_stream_count(user_id) == 1
+
+
+async def test_admit_script_respects_stream_limit(redis_client, user_id, cleanup):
+    """Test that ADMIT_SCRIPT allows the request but refuses a slot at the limit."""
+    stream_limiter = StreamLimiter(redis_client, default_limit=1)
+    admission = ChatAdmission(RateLimiter(redis_client), stream_limiter)
+
+    first = await admission.admit(user_id, rate_limit=10, window=3600)
+    second = await admission.admit(user_id, rate_limit=10, window=3600)
+
+    assert first.stream_id is not None
+    assert second.allowed
+    assert second.stream_id is None
+    assert second.active_streams == 1
+
+    # Releasing the slot lets the next request claim it
+    await stream_limiter.unregister_stream(user_id, first.stream_id)
+    assert (await admission.admit(user_id, rate_limit=10, window=3600)).stream_id is not None
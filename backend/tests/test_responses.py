@@ -0,0 +1,34 @@
+"""Tests for precomputed static responses."""
+from starlette.requests import Request
+
+from app.api.responses import StaticJSON
+
+
+def make_request(if_none_match=None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_serves_body_with_etag():
+    """Test that the payload is served with its ETag and cache policy."""
+    static = StaticJSON({"status": "ok"}, cache_control="no-cache")
+    response = static.response(make_request())
+
+    assert response.status_code == 200
+    assert response.body == b'{"status":"ok"}'
+    assert response.headers["etag"] == static.etag
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_matching_etag_returns_not_modified():
+    """Test that If-None-Match with the current ETag (weak or in a list) gets a 304."""
+    static = StaticJSON({"status": "ok"}, cache_control="no-cache")
+
+    for header in (static.etag, f"W/{static.etag}", f'"other", {static.etag}', "*"):
+        response = static.response(make_request(header))
+        assert response.status_code == 304
+        assert response.body == b""
+
+    assert static.response(make_request('"stale"')).status_code == 200
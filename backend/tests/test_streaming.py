@@ -0,0 +1,84 @@
+"""Tests for SSE streaming helpers."""
+import asyncio
+
+import pytest
+
+from app.services.streaming import HEARTBEAT_FRAME, coalesce_tokens, with_heartbeat
+
+
+async def _tokens(items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+async def test_coalesces_until_min_chars():
+    """Test that fast tokens are merged into chunks of at least min_chars."""
+    chunks = await _collect(coalesce_tokens(_tokens(["ab", "cd", "ef", "gh", "i"]), min_chars=4))
+
+    assert chunks == ["abcd", "efgh", "i"]
+
+
+async def test_flushes_after_max_delay():
+    """Test that a slow upstream still flushes once the delay passes."""
+    chunks = await _collect(
+        coalesce_tokens(_tokens(["a", "b"], delay=0.05), min_chars=100, max_delay=0.01)
+    )
+
+    assert chunks == ["a", "b"]
+
+
+async def test_preserves_content():
+    """Test that coalescing never drops or reorders text."""
+    tokens = [f"tok{i} " for i in range(50)]
+
+    chunks = await _collect(coalesce_tokens(_tokens(tokens), min_chars=16))
+
+    assert "".join(chunks) == "".join(tokens)
+
+
+async def test_empty_stream_yields_nothing():
+    """Test that an empty upstream produces no chunks."""
+    assert await _collect(coalesce_tokens(_tokens([]))) == []
+
+
+async def test_heartbeat_sent_while_upstream_idle():
+    """Test that heartbeats fill gaps without dropping upstream frames."""
+    frames = await _collect(with_heartbeat(_tokens([b"a", b"b"], delay=0.05), interval=0.02))
+
+    assert frames[-1] == b"b"
+    assert [f for f in frames if f != HEARTBEAT_FRAME] == [b"a", b"b"]
+    assert HEARTBEAT_FRAME in frames
+
+
+async def test_closing_stream_closes_upstream():
+    """Test that abandoning the stream early closes the upstream generator."""
+    closed = []
+
+    async def upstream():
+        try:
+            for i in range(100):
+                yield f"token{i}"
+        finally:
+            closed.append(True)
+
+    stream = coalesce_tokens(upstream(), min_chars=1)
+    assert await stream.__anext__() == "token0"
+    await stream.aclose()
+
+    assert closed == [True]
+
+
+async def test_upstream_error_propagates():
+    """Test that an upstream failure reaches the consumer instead of ending the stream."""
+    async def upstream():
+        yield "partial"
+        raise RuntimeError("LLM went away")
+
+    with pytest.raises(RuntimeError, match="LLM went away"):
+        await _collect(coalesce_tokens(upstream(), min_chars=100))
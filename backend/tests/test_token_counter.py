@@ -0,0 +1,163 @@
+"""Tests for the Rust token counter client."""
+import asyncio
+import time
+
+import httpx
+
+from app.services.token_counter import (
+    FAILURE_THRESHOLD,
+    TokenCounterClient,
+    _cost_cached,
+    _estimate_tokens_cached,
+)
+
+
+def _client_with(handler) -> TokenCounterClient:
+    """Create a client whose requests are answered by handler."""
+    client = TokenCounterClient("http://token-counter")
+    client._client = httpx.AsyncClient(
+        base_url="http://token-counter",
+        transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+async def test_estimate_tokens_batch_uses_one_request():
+    """Test that a batch of texts is counted in a single /tokens/batch call."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"tokens": [4, 0, 3], "model": "gpt-4"})
+
+    client = _client_with(handler)
+    counts = await client.estimate_tokens_batch(["Hello, world!", "", "How are you?"], "gpt-4")
+
+    assert counts == [4, 0, 3]
+    assert len(requests) == 1
+    assert requests[0].url.path == "/tokens/batch"
+    assert requests[0].headers["content-type"] == "application/json"
+    await client.close()
+
+
+async def test_estimate_tokens_batch_falls_back_locally():
+    """Test that service errors fall back to local estimates, in order."""
+    client = _client_with(lambda request: httpx.Response(503))
+    texts = ["Hello, world!", "", "The quick brown fox jumps over the lazy dog"]
+
+    counts = await client.estimate_tokens_batch(texts)
+
+    assert counts == [client._local_estimate_tokens(text) for text in texts]
+    assert counts[1] == 0
+    await client.close()
+
+
+def test_local_estimates_are_cached():
+    """Test that repeated local estimates are served from the cache."""
+    client = TokenCounterClient("http://token-counter", enabled=False)
+    client.cache_clear()
+    text = "You are a helpful assistant."
+
+    first = client._local_estimate_tokens(text)
+    assert client._local_estimate_tokens(text) == first
+    assert client._local_calculate_cost("gpt-4", 100, 50) == client._local_calculate_cost("gpt-4", 100, 50)
+
+    assert _estimate_tokens_cached.cache_info().hits == 1
+    assert _cost_cached.cache_info().hits == 1
+
+    client.cache_clear()
+    assert _estimate_tokens_cached.cache_info().currsize == 0
+
+
+async def test_repeated_estimates_use_one_request():
+    """Test that identical estimates, even concurrent ones, share one call."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"tokens": 7, "model": "gpt-4"})
+
+    client = _client_with(handler)
+    counts = await asyncio.gather(*(client.estimate_tokens("Same prompt", "gpt-4") for _ in range(5)))
+    counts.append(await client.estimate_tokens("Same prompt", "gpt-4"))
+
+    assert counts == [7] * 6
+    assert len(requests) == 1
+
+    await client.estimate_tokens("Same prompt", "gpt-3.5-turbo")
+    assert len(requests) == 2
+
+    client.cache_clear()
+    await client.estimate_tokens("Same prompt", "gpt-4")
+    assert len(requests) == 3
+    await client.close()
+
+
+async def test_failed_requests_are_not_cached():
+    """Test that a service error falls back locally and is retried next time."""
+    responses = [httpx.Response(503), httpx.Response(200, json={"tokens": 9, "model": "gpt-4"})]
+    client = _client_with(lambda request: responses.pop(0))
+
+    assert await client.estimate_tokens("Retry me") == client._local_estimate_tokens("Retry me")
+    assert await client.estimate_tokens("Retry me") == 9
+    await client.close()
+
+
+async def test_context_manager_closes_pool():
+    """Test that leaving the async with block releases the HTTP client."""
+    async with _client_with(lambda request: httpx.Response(200, json={"tokens": 2})) as client:
+        assert await client.estimate_tokens("Hi there") == 2
+        pool = client._client
+
+    assert client._client is None
+    assert pool.is_closed
+
+
+async def test_repeated_failures_skip_the_service():
+    """Test that the client estimates locally for a while after repeated failures."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(503)
+
+    client = _client_with(handler)
+    for i in range(FAILURE_THRESHOLD):
+        await client.estimate_tokens(f"Attempt {i}")
+    assert len(requests) == FAILURE_THRESHOLD
+
+    # Degraded: answered locally without a request
+    assert await client.estimate_tokens("Still down?") == client._local_estimate_tokens("Still down?")
+    assert (await client.estimate_cost("gpt-4", tokens_in=10, tokens_out=5))["source"] == "local_fallback"
+    assert len(requests) == FAILURE_THRESHOLD
+
+    # Once the backoff has passed the service is tried again; another
+    # failure doubles the backoff
+    first_backoff = client._degraded_until - time.monotonic()
+    client._degraded_until = 0.0
+    await client.estimate_tokens("Back yet?")
+    assert len(requests) == FAILURE_THRESHOLD + 1
+    assert 0 < first_backoff <= 1
+    assert 1 < client._degraded_until - time.monotonic() <= 2
+    await client.close()
+
+
+async def test_successful_ping_ends_backoff():
+    """Test that a healthy keep-alive ping resumes calls to the service."""
+    healthy = False
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health":
+            return httpx.Response(200 if healthy else 503)
+        return httpx.Response(200, json={"tokens": 3}) if healthy else httpx.Response(503)
+
+    client = _client_with(handler)
+    for i in range(FAILURE_THRESHOLD):
+        await client.estimate_tokens(f"Attempt {i}")
+    assert await client.ping() == 503
+    assert not client._use_service()
+
+    healthy = True
+    assert await client.ping() == 200
+    assert await client.estimate_tokens("Recovered") == 3
+    await client.close()
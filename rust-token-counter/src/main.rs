@@ -124,6 +124,22 @@ struct TokenEstimateResponse {
     model: String,
 }
 
+#[derive(Debug, Deserialize)]
+struct BatchTokenEstimateRequest {
+    /// Input texts to tokenize
+    texts: Vec<String>,
+    /// Model name for pricing lookup
+    #[serde(default = "default_model")]
+    model: String,
+}
+
+#[derive(Debug, Serialize)]
+struct BatchTokenEstimateResponse {
+    /// Token counts, in the same order as the request texts
+    tokens: Vec<u32>,
+    model: String,
+}
+
 #[derive(Debug, Deserialize)]
 struct CostEstimateRequest {
     /// Input text (will be tokenized)
@@ -189,6 +205,18 @@ async fn estimate_tokens_handler(
     }))
 }
 
+async fn estimate_tokens_batch_handler(
+    Json(req): Json<BatchTokenEstimateRequest>,
+) -> Json<BatchTokenEstimateResponse> {
+    // Empty texts count as 0 tokens rather than failing the whole batch
+    let tokens: Vec<u32> = req.texts.iter().map(|text| estimate_tokens(text)).collect();
+
+    Json(BatchTokenEstimateResponse {
+        tokens,
+        model: req.model,
+    })
+}
+
 async fn estimate_cost_handler(
     Json(req): Json<CostEstimateRequest>,
 ) -> Result<Json<CostEstimateResponse>, (StatusCode, Json<ErrorResponse>)> {
@@ -251,6 +279,7 @@ async fn main() {
     let app = Router::new()
         .route("/health", get(health))
         .route("/tokens", post(estimate_tokens_handler))
+        .route("/tokens/batch", post(estimate_tokens_batch_handler))
         .route("/cost", post(estimate_cost_handler))
         .route("/models", get(list_models))
         .layer(cors);